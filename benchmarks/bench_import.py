@@ -0,0 +1,58 @@
+"""
+Benchmark the time to import intake_sdmx and to build the catalog of SDMX sources.
+
+Each measurement runs in a fresh interpreter so that module caches
+do not distort the results. Run from the repository root::
+
+    python benchmarks/bench_import.py [--repeat N]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+import intake_sdmx
+t1 = time.perf_counter()
+imported = [m for m in ("pandas", "pandasdmx", "pydantic", "requests") if m in sys.modules]
+src = intake_sdmx.SDMXSources()
+names = list(src)
+t2 = time.perf_counter()
+src._entries["ECB"]
+t3 = time.perf_counter()
+print(json.dumps({
+    "import": t1 - t0,
+    "catalog": t2 - t1,
+    "entry": t3 - t2,
+    "imported": imported,
+}))
+"""
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    runs = [run_once() for _ in range(args.repeat)]
+    print("heavy modules imported by 'import intake_sdmx':", runs[0]["imported"])
+    for phase in ["import", "catalog", "entry"]:
+        times = [r[phase] * 1000 for r in runs]
+        print(
+            f"{phase:>8}: median {statistics.median(times):8.1f} ms"
+            f"  min {min(times):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark the plugin against a local SDMX server serving synthetic data.
+
+No network access is needed. The stand-in server (see sdmx_server.py)
+serves dataflows, a DSD with large codelists and data messages of the size
+given on the command line. Run from the repository root::
+
+    python benchmarks/bench_plugin.py [--flows N] [--codes N] [--series N]
+        [--obs N] [--repeat N] [--json FILE]
+
+Measured phases:
+
+    sources: build :class:`intake_sdmx.SDMXSources` and list its entries
+    dataflows: load the :class:`intake_sdmx.SDMXDataflows` catalog
+    entry: materialize a dataflow entry incl. DSD and codelists
+    validate: :meth:`intake_sdmx.SDMXCodeParam.validate` with all codes
+        and all names of a dimension
+    search: search dataflow names and IDs
+    read: :meth:`intake_sdmx.SDMXData.read` of all series; reports
+        observations per second and peak memory traced by tracemalloc
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sdmx_server import FIRST_YEAR, SDMXServer  # noqa: E402
+
+import intake_sdmx  # noqa: E402
+
+
+def timeit(func, repeat):
+    """
+    Call `func` `repeat` times and return list of durations in seconds
+    and the last result.
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return times, result
+
+
+def peak_memory(func):
+    """
+    Return peak memory in bytes allocated while calling `func`.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(args):
+    results = {}
+
+    def record(phase, times, **extra):
+        results[phase] = {
+            "median": statistics.median(times),
+            "min": min(times),
+            **extra,
+        }
+
+    with SDMXServer(
+        n_flows=args.flows,
+        n_dims=args.dims,
+        n_codes=args.codes,
+        n_series=args.series,
+        n_obs=args.obs,
+    ) as server:
+        source_id = server.source_id
+        flow_id = server.source.flow_ids[-1]
+
+        def sources():
+            src = intake_sdmx.SDMXSources()
+            list(src)
+            return src
+
+        record("sources", timeit(sources, args.repeat)[0])
+
+        def dataflows():
+            return intake_sdmx.SDMXDataflows(metadata={"source_id": source_id})
+
+        times, cat = timeit(dataflows, args.repeat)
+        record("dataflows", times, flows=len(cat._flows))
+
+        def entry():
+            # fresh catalog so that the entry is built from scratch
+            cat = dataflows()
+            t0 = time.perf_counter()
+            cat._entries[flow_id]
+            return time.perf_counter() - t0
+
+        times = [entry() for _ in range(args.repeat)]
+        record("entry", times, codes=args.codes * args.dims)
+
+        entry = cat._entries[flow_id]
+        param = next(p for p in entry._user_parameters if p.name == "DIM0")
+        codes = param.allowed[:-1:2]
+        names = param.allowed[1::2]
+
+        def validate():
+            param.validate(codes)
+            param.validate(names)
+
+        record("validate", timeit(validate, args.repeat)[0], keys=2 * len(codes))
+
+        def search():
+            return cat.search("money exchange rates")
+
+        times, hits = timeit(search, args.repeat)
+        # search results are keyed by dataflow ID and name
+        record("search", times, hits=len(hits._entries) // 2)
+
+        def read():
+            return entry(
+                startPeriod=str(FIRST_YEAR),
+                endPeriod=str(FIRST_YEAR + args.obs - 1),
+            ).read()
+
+        sent = server.bytes_sent
+        times, data = timeit(read, args.repeat)
+        nbytes = (server.bytes_sent - sent) // args.repeat
+        observations = len(data)
+        del data
+        record(
+            "read",
+            times,
+            observations=observations,
+            obs_per_second=observations / statistics.median(times),
+            response_bytes=nbytes,
+            peak_memory=peak_memory(read),
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flows", type=int, default=2000, help="dataflows")
+    parser.add_argument("--dims", type=int, default=4, help="coded dimensions")
+    parser.add_argument("--codes", type=int, default=5000, help="codes/dimension")
+    parser.add_argument("--series", type=int, default=1000, help="series/message")
+    parser.add_argument("--obs", type=int, default=50, help="observations/series")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+    results = run(args)
+    for phase, result in results.items():
+        extra = "  ".join(
+            f"{k}={v:,.0f}" for k, v in result.items() if k not in ("median", "min")
+        )
+        print(
+            f"{phase:>10}: median {result['median'] * 1000:9.1f} ms"
+            f"  min {result['min'] * 1000:9.1f} ms  {extra}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Local stand-in for an SDMX REST web service serving synthetic data.
+
+The server generates dataflows, a data structure definition (DSD) with large
+codelists and structure-specific data messages of configurable size. It runs
+in a background thread so that the plugin can be benchmarked without network
+access::
+
+    with SDMXServer(n_flows=1000, n_codes=5000) as server:
+        intake_sdmx.SDMXDataflows(metadata={"source_id": server.source_id})
+
+Supported endpoints:
+
+    /dataflow/<agency>/latest, /dataflow/<agency>/all/latest: all dataflows
+    /dataflow/<agency>/<flow ID>/latest: dataflow with DSD, concepts
+        and codelists
+    /datastructure/<agency>/<DSD ID>/latest: DSD, concepts and codelists
+    /data/<flow ID>/<key>: data for the given key. Query parameters
+        startPeriod and endPeriod (years) are honoured.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice, product
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import quoteattr
+
+AGENCY = "BENCH"
+DSD_ID = "DSD_BENCH"
+FIRST_YEAR = 1900
+
+STRUCTURE_TYPE = "application/vnd.sdmx.structure+xml;version=2.1"
+DATA_TYPE = "application/vnd.sdmx.structurespecificdata+xml;version=2.1"
+
+# words from which dataflow names are composed so that search has something
+# to match
+WORDS = (
+    "exchange interest rates prices trade balance payments monetary "
+    "statistics money supply inflation employment wages production "
+    "industry banking credit loans deposits securities"
+).split()
+
+STRUCTURE_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<mes:Structure xmlns:mes="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" \
+xmlns:str="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure" \
+xmlns:com="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common">
+<mes:Header><mes:ID>BENCH</mes:ID><mes:Test>true</mes:Test>\
+<mes:Prepared>2021-01-01T00:00:00</mes:Prepared><mes:Sender id="BENCH"/></mes:Header>
+<mes:Structures>
+"""
+
+STRUCTURE_FOOTER = "</mes:Structures>\n</mes:Structure>\n"
+
+DATA_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<message:StructureSpecificData \
+xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" \
+xmlns:common="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common" \
+xmlns:data="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/data/structurespecific" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" \
+xmlns:ns1="{urn}:ObsLevelDim:TIME_PERIOD">
+<message:Header><message:ID>BENCH</message:ID><message:Test>true</message:Test>\
+<message:Prepared>2021-01-01T00:00:00</message:Prepared><message:Sender id="BENCH"/>\
+<message:Structure structureID="{dsd}" dimensionAtObservation="TIME_PERIOD" \
+namespace="{urn}:ObsLevelDim:TIME_PERIOD"><common:Structure><URN>{urn}</URN>\
+</common:Structure></message:Structure></message:Header>
+<message:DataSet data:structureRef="{dsd}" xsi:type="ns1:DataSetType">
+"""
+
+DATA_FOOTER = "</message:DataSet>\n</message:StructureSpecificData>\n"
+
+
+def _ref(id, cls, package, parent=None):
+    parent = (
+        f' maintainableParentID="{parent}" maintainableParentVersion="1.0"'
+        if parent
+        else ""
+    )
+    version = "" if parent else ' version="1.0"'
+    return (
+        f'<Ref id="{id}"{parent}{version} agencyID="{AGENCY}" '
+        f'package="{package}" class="{cls}"/>'
+    )
+
+
+class SyntheticSource:
+    """
+    Generate SDMX-ML messages of configurable size.
+
+    Parameters:
+
+        n_flows[int]: number of dataflows. All of them share one DSD.
+        n_dims[int]: number of coded dimensions besides FREQ
+        n_codes[int]: number of codes in each dimension's codelist
+        n_series[int]: maximum number of series per data message
+        n_obs[int]: number of annual observations per series
+    """
+
+    def __init__(self, n_flows=100, n_dims=4, n_codes=100, n_series=100, n_obs=50):
+        self.n_flows = n_flows
+        self.n_dims = n_dims
+        self.n_codes = n_codes
+        self.n_series = n_series
+        self.n_obs = n_obs
+        self.dimensions = ["FREQ"] + [f"DIM{i}" for i in range(n_dims)]
+        self.codes = {"FREQ": ["A"]}
+        for dim in self.dimensions[1:]:
+            self.codes[dim] = [f"{dim[3:]}C{j:05d}" for j in range(n_codes)]
+        self._structure = None
+
+    @property
+    def flow_ids(self):
+        return [f"DF{i:05d}" for i in range(self.n_flows)]
+
+    def flow_name(self, i):
+        words = [WORDS[(i * k + k) % len(WORDS)] for k in (1, 3, 7)]
+        return f"Synthetic {' '.join(words)} {i}"
+
+    def _dataflow(self, i):
+        return (
+            f'<str:Dataflow id="DF{i:05d}" agencyID="{AGENCY}" version="1.0">'
+            f'<com:Name xml:lang="en">{self.flow_name(i)}</com:Name>'
+            f"<str:Structure>{_ref(DSD_ID, 'DataStructure', 'datastructure')}"
+            "</str:Structure></str:Dataflow>\n"
+        )
+
+    def dataflows(self, flow_id=None):
+        """
+        Return structure message with all dataflows or, if `flow_id` is given,
+        that dataflow with its DSD, concepts and codelists.
+        """
+        if flow_id is None:
+            flows = "".join(self._dataflow(i) for i in range(self.n_flows))
+            return "".join(
+                [
+                    STRUCTURE_HEADER,
+                    "<str:Dataflows>\n",
+                    flows,
+                    "</str:Dataflows>\n",
+                    STRUCTURE_FOOTER,
+                ]
+            )
+        try:
+            i = self.flow_ids.index(flow_id)
+        except ValueError:
+            return None
+        return self._structure_message(
+            "<str:Dataflows>\n" + self._dataflow(i) + "</str:Dataflows>\n"
+        )
+
+    def datastructure(self):
+        """
+        Return structure message with the DSD, its concepts and codelists.
+        """
+        return self._structure_message("")
+
+    def _structure_message(self, flows):
+        # codelists, concepts and DSD are the same for all flows
+        if self._structure is None:
+            self._structure = self._structures()
+        return "".join([STRUCTURE_HEADER, self._structure, flows, STRUCTURE_FOOTER])
+
+    def _structures(self):
+        parts = ["<str:Codelists>\n"]
+        for dim in self.dimensions:
+            parts.append(
+                f'<str:Codelist id="CL_{dim}" agencyID="{AGENCY}" version="1.0">'
+                f'<com:Name xml:lang="en">Codelist for {dim}</com:Name>\n'
+            )
+            parts.extend(
+                f'<str:Code id="{code}"><com:Name xml:lang="en">'
+                f"Name of {code}</com:Name></str:Code>\n"
+                for code in self.codes[dim]
+            )
+            parts.append("</str:Codelist>\n")
+        parts.append("</str:Codelists>\n<str:Concepts>\n")
+        parts.append(
+            f'<str:ConceptScheme id="CS_BENCH" agencyID="{AGENCY}" version="1.0">'
+            '<com:Name xml:lang="en">Concepts</com:Name>\n'
+        )
+        parts.extend(
+            f'<str:Concept id="{id}"><com:Name xml:lang="en">{id}</com:Name>'
+            "</str:Concept>\n"
+            for id in self.dimensions + ["TIME_PERIOD", "OBS_VALUE"]
+        )
+        parts.append("</str:ConceptScheme>\n</str:Concepts>\n<str:DataStructures>\n")
+        parts.append(
+            f'<str:DataStructure id="{DSD_ID}" agencyID="{AGENCY}" version="1.0">'
+            '<com:Name xml:lang="en">Synthetic DSD</com:Name>'
+            "<str:DataStructureComponents>"
+            '<str:DimensionList id="DimensionDescriptor">\n'
+        )
+        concept = lambda id: (  # noqa: E731
+            "<str:ConceptIdentity>"
+            + _ref(id, "Concept", "conceptscheme", parent="CS_BENCH")
+            + "</str:ConceptIdentity>"
+        )
+        for pos, dim in enumerate(self.dimensions, 1):
+            parts.append(
+                f'<str:Dimension id="{dim}" position="{pos}">{concept(dim)}'
+                "<str:LocalRepresentation><str:Enumeration>"
+                f"{_ref('CL_' + dim, 'Codelist', 'codelist')}"
+                "</str:Enumeration></str:LocalRepresentation></str:Dimension>\n"
+            )
+        parts.append(
+            '<str:TimeDimension id="TIME_PERIOD" '
+            f'position="{len(self.dimensions) + 1}">{concept("TIME_PERIOD")}'
+            "<str:LocalRepresentation>"
+            '<str:TextFormat textType="ObservationalTimePeriod"/>'
+            "</str:LocalRepresentation></str:TimeDimension>\n"
+            "</str:DimensionList>"
+            '<str:MeasureList id="MeasureDescriptor">'
+            f'<str:PrimaryMeasure id="OBS_VALUE">{concept("OBS_VALUE")}'
+            "</str:PrimaryMeasure></str:MeasureList>"
+            "</str:DataStructureComponents></str:DataStructure>\n"
+            "</str:DataStructures>\n"
+        )
+        return "".join(parts)
+
+    def data(self, key="", start=None, end=None):
+        """
+        Return structure-specific data message for `key`
+        in the usual dot-separated form, e.g. "A.C00001+C00002..".
+        Missing or empty dimensions select all codes.
+        """
+        selected = key.split(".") if key else []
+        selected += [""] * (len(self.dimensions) - len(selected))
+        codes = [
+            sel.split("+") if sel else self.codes[dim]
+            for dim, sel in zip(self.dimensions, selected)
+        ]
+        first = max(FIRST_YEAR, int(start or FIRST_YEAR))
+        last = min(FIRST_YEAR + self.n_obs - 1, int(end or 9999))
+        obs = "".join(
+            f'<Obs TIME_PERIOD="{year}" OBS_VALUE="{{value}}.{year % 97}"/>'
+            for year in range(first, last + 1)
+        )
+        urn = (
+            "urn:sdmx:org.sdmx.infomodel.datastructure.DataStructure="
+            f"{AGENCY}:{DSD_ID}(1.0)"
+        )
+        parts = [DATA_HEADER.format(urn=urn, dsd=DSD_ID)]
+        for n, series_key in enumerate(islice(product(*codes), self.n_series)):
+            attrs = " ".join(
+                f"{dim}={quoteattr(code)}"
+                for dim, code in zip(self.dimensions, series_key)
+            )
+            parts.append(f"<Series {attrs}>{obs.format(value=n)}</Series>\n")
+        parts.append(DATA_FOOTER)
+        return "".join(parts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        source = self.server.source
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.strip("/").split("/")
+        body, content_type = None, STRUCTURE_TYPE
+        if path[0] == "dataflow":
+            # /dataflow/<agency>[/<flow ID>]/<version>
+            flow_id = path[2] if len(path) > 3 else "all"
+            body = source.dataflows(None if flow_id == "all" else flow_id)
+        elif path[0] == "datastructure":
+            body = source.datastructure()
+        elif path[0] == "data" and len(path) > 1:
+            key = path[2] if len(path) > 2 else ""
+            body = source.data(key, query.get("startPeriod"), query.get("endPeriod"))
+            content_type = DATA_TYPE
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode()
+        self.server.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SDMXServer:
+    """
+    Serve a :class:`SyntheticSource` on localhost in a background thread
+    and register it as a pandasdmx data source.
+
+    Parameters:
+
+        source_id[str]: ID under which the server is registered
+            with pandasdmx. Default: "BENCH"
+        port[int]: 0 (default) picks a free port
+        kwargs: passed to :class:`SyntheticSource`
+    """
+
+    def __init__(self, source_id="BENCH", port=0, **kwargs):
+        self.source_id = source_id
+        self.source = SyntheticSource(**kwargs)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.source = self.source
+        self._server.bytes_sent = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://%s:%d" % self._server.server_address
+
+    @property
+    def bytes_sent(self):
+        return self._server.bytes_sent
+
+    def start(self):
+        from pandasdmx.source import add_source
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        add_source(
+            {
+                "id": self.source_id,
+                "url": self.url,
+                "name": "Synthetic SDMX source for benchmarks",
+            },
+            override=True,
+        )
+        return self
+
+    def stop(self):
+        from pandasdmx.source import sources
+
+        sources.pop(self.source_id, None)
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,44 +1,946 @@
 """intake plugin for SDMX data sources"""
 
 
+import asyncio
+import contextvars
+import copy
+import hashlib
+import importlib
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict
 from collections.abc import MutableMapping
-from datetime import date
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from functools import partial
+from io import BytesIO
+from itertools import chain, product
+from pathlib import Path
+from types import SimpleNamespace
 
 import intake
-import pandasdmx as sdmx
+import msgpack
 from intake.catalog import Catalog
 from intake.catalog.local import LocalCatalogEntry, UserParameter
-from intake.catalog.utils import reload_on_change
+from intake.catalog.utils import coerce, reload_on_change
 
 __version__ = "0.2.1"
 
 __all__ = ["SDMXSources", "SDMXDataflows", "SDMXData"]
 
+
+class LazyModule:
+    """
+    Proxy for a module which is imported on first attribute access.
+    Importing pandasdmx, and through it pandas and pydantic, is slow.
+    It is deferred so that processes which merely discover intake drivers
+    do not pay for it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self._name!r}>"
+
+
+pd = LazyModule("pandas")
+sdmx = LazyModule("pandasdmx")
+requests = LazyModule("requests")
+
 # indicate wildcarded dimensions for data reads
 NOT_SPECIFIED = "*"
 
+# keys of `storage_options` consumed by intake_sdmx itself.
+# All other options are passed on to :class:`pandasdmx.Request`.
+PLUGIN_OPTIONS = {
+    "metadata_cache",
+    "result_cache",
+    "pool_size",
+    "max_retries",
+    "max_url_length",
+    "snapshot",
+    "max_entries",
+    "max_entries_bytes",
+}
+
+# Data requests whose estimated URL is longer are split into several requests.
+# Override per catalog or data source by the "max_url_length" storage option.
+MAX_URL_LENGTH = 2000
+
+# HTTP status codes indicating that a data request should be split.
+# 413: payload too large, 414: URI too long. Some sources respond
+# with 500 if the result is too large.
+SPLIT_STATUS_CODES = {413, 414, 500}
+
+# Status codes in SPLIT_STATUS_CODES which may as well indicate a server failure.
+# Requests rejected with them are split only once so as not to
+# flood a failing source with ever smaller requests.
+SPLIT_ONCE_STATUS_CODES = {500}
+
+# Politeness limits: maximum number of concurrent data requests
+# per SDMX source within this process. Sources not listed here
+# are limited to DEFAULT_MAX_CONCURRENT_REQUESTS.
+MAX_CONCURRENT_REQUESTS = {}
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+_source_semaphores = {}
+_source_semaphores_lock = threading.Lock()
+
+
+def source_semaphore(source_id):
+    """
+    Return the process-wide semaphore limiting concurrent requests to `source_id`.
+    """
+    with _source_semaphores_lock:
+        try:
+            return _source_semaphores[source_id]
+        except KeyError:
+            limit = MAX_CONCURRENT_REQUESTS.get(
+                source_id, DEFAULT_MAX_CONCURRENT_REQUESTS
+            )
+            return _source_semaphores.setdefault(
+                source_id, threading.BoundedSemaphore(limit)
+            )
+
+
+def split_storage_options(storage_options):
+    """
+    Split `storage_options` into options for intake_sdmx
+    and  options for :class:`pandasdmx.Request`.
+
+    Return: 2-tuple of dicts
+    """
+    storage_options = storage_options or {}
+    plugin_options = {k: v for k, v in storage_options.items() if k in PLUGIN_OPTIONS}
+    request_options = {
+        k: v for k, v in storage_options.items() if k not in PLUGIN_OPTIONS
+    }
+    return plugin_options, request_options
+
+
+# pooled HTTP sessions shared by all requests to a given source
+# with equal session options. See get_session().
+_sessions = {}
+_sessions_lock = threading.Lock()
+# default number of connections kept alive per session
+DEFAULT_POOL_SIZE = 10
+
+
+def get_session(source_id, pool_size=None, max_retries=0, **session_options):
+    """
+    Return  a process-wide :class:`pandasdmx.remote.Session` for `source_id`.
+    Sessions are shared by all callers passing equal arguments. Thus
+    connections to the SDMX web service are kept alive and reused.
+    This function is thread-safe.
+
+    Parameters:
+
+        source_id[str]: ID of the SDMX source
+        pool_size[int]: maximum number of connections kept alive.
+            Default: :data:`DEFAULT_POOL_SIZE`
+        max_retries[int, urllib3.util.Retry]: number of retries
+            of failed requests, or a Retry instance. Default: 0
+        session_options: passed to :class:`pandasdmx.remote.Session`, e.g.
+            proxies or cache options
+    """
+    pool_size = pool_size or DEFAULT_POOL_SIZE
+    key = (
+        source_id,
+        pool_size,
+        repr(max_retries),
+        repr(sorted(session_options.items())),
+    )
+    with _sessions_lock:
+        try:
+            return _sessions[key]
+        except KeyError:
+            session = sdmx.remote.Session(**session_options)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=max_retries,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].append(record_transfer)
+            return _sessions.setdefault(key, session)
+
+
+def close_sessions():
+    """
+    Close and forget all sessions returned by :func:`get_session`.
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# Time to live in seconds of available series keys used to prune data requests
+# if neither the metadata cache nor the catalog specifies a ttl
+DEFAULT_SERIES_KEYS_TTL = 3600
+
+# available series keys per (source_id, dataflow_id) as returned by
+# SDMXData._series_keys() together with their expiry time.
+# Used to prune data requests.
+_series_keys = {}
+_series_keys_lock = threading.Lock()
+# guards the catalogs sharing a StructureRegistry.
+# See SDMXDataflows._release_structures().
+_registry_users_lock = threading.Lock()
+
+
+def clear_series_keys():
+    """
+    Forget the available series keys cached in memory
+    for pruning data requests.
+    """
+    with _series_keys_lock:
+        _series_keys.clear()
+
+
+# identifies snapshots written by SDMXDataflows.to_snapshot()
+SNAPSHOT_FORMAT = "intake_sdmx.snapshot/1"
+
+
+def read_snapshot(path):
+    """
+    Read a catalog snapshot written by :meth:`SDMXDataflows.to_snapshot`.
+    """
+    snapshot = msgpack.unpackb(Path(path).read_bytes(), raw=False)
+    if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not an intake_sdmx snapshot.")
+    return snapshot
+
+
+def make_request(source_id, storage_options):
+    """
+    Return a :class:`pandasdmx.Request` for `source_id`
+    configured by those `storage_options` not consumed by intake_sdmx.
+    Unless a session is specified,
+    the request uses a pooled session shared with other requests
+    (see :func:`get_session`).
+    """
+    plugin_options, options = split_storage_options(storage_options)
+    request_kwargs = {
+        k: options.pop(k) for k in ("log_level", "timeout") if k in options
+    }
+    session = options.pop("session", None)
+    if session is None:
+        session = get_session(
+            source_id,
+            pool_size=plugin_options.get("pool_size"),
+            max_retries=plugin_options.get("max_retries", 0),
+            **options,
+        )
+    return sdmx.Request(source_id, session=session, **request_kwargs)
+
+
+# callables receiving each metrics event. See add_metrics_hook().
+_metrics_hooks = []
+# list of (seconds, bytes, from_cache) tuples of the HTTP responses received
+# within the current thread or task. See capture_transfers().
+_transfers = contextvars.ContextVar("intake_sdmx_transfers", default=None)
+
+
+def add_metrics_hook(hook):
+    """
+    Register callable `hook` to be called with each event recorded
+    by the :class:`Metrics` of any catalog or data source,
+    e.g. to export them to a monitoring system.
+    Events are dicts. See :meth:`Metrics.record`.
+    """
+    _metrics_hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    """
+    Unregister `hook` registered by :func:`add_metrics_hook`.
+    """
+    _metrics_hooks.remove(hook)
+
+
+@contextmanager
+def capture_transfers():
+    """
+    Context manager yielding a list to which :func:`record_transfer`
+    appends the HTTP responses received within the with-block in the current
+    thread or task.
+    """
+    transfers = []
+    token = _transfers.set(transfers)
+    try:
+        yield transfers
+    finally:
+        _transfers.reset(token)
+
+
+def record_transfer(response, *args, **kwargs):
+    """
+    Response hook for :class:`requests.Session`. Record the time to download
+    `response`, its size and whether it has been cached by requests_cache
+    if called within :func:`capture_transfers`.
+    """
+    transfers = _transfers.get()
+    if transfers is not None:
+        start = time.perf_counter()
+        nbytes = len(response.content or b"")
+        seconds = response.elapsed.total_seconds() + time.perf_counter() - start
+        transfers.append((seconds, nbytes, getattr(response, "from_cache", False)))
+    return response
+
+
+class Metrics:
+    """
+    Timings and counters of a catalog or data source by phase:
+
+        - "load": loading a catalog of dataflows
+        - "entry": building  a dataflow entry including metadata requests
+        - "metadata": getting a structure message from the metadata cache
+          or the SDMX source
+        - "read": reading a data source
+        - "cache": looking up the result cache
+        - "download": HTTP requests
+        - "parse": parsing SDMX messages
+        - "convert": converting data messages to pandas or pyarrow
+
+    Phases may be nested. E.g., "entry" comprises "metadata" which,  in turn,
+    comprises "download" and "parse". Events are passed to the hooks registered
+    by :func:`add_metrics_hook`.
+
+    Parameters:
+
+        context: items added to each event, e.g. source_id
+    """
+
+    counters = ["count", "seconds", "bytes", "cache_hits", "observations"]
+
+    def __init__(self, **context):
+        self.context = context
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def record(
+        self, phase, seconds=0.0, nbytes=0, cache_hit=False, observations=0, **details
+    ):
+        """
+        Add an event to the totals of `phase`, and pass it to the hooks.
+
+        Parameters:
+
+            phase[str]: e.g. "download"
+            seconds[float]: duration
+            nbytes[int]: bytes transferred
+            cache_hit[bool]: whether the result was taken from a cache
+            observations[int]: number of observations
+            details: further items of the event, e.g. resource_type
+
+        Return: the event, i.e. a dict of the above, the context and
+            the keys "bytes" and "cache_hit"
+        """
+        event = {
+            **self.context,
+            **details,
+            "phase": phase,
+            "seconds": seconds,
+            "bytes": nbytes,
+            "cache_hit": cache_hit,
+            "observations": observations,
+        }
+        with self._lock:
+            totals = self._phases.setdefault(phase, dict.fromkeys(self.counters, 0))
+            totals["count"] += 1
+            totals["seconds"] += seconds
+            totals["bytes"] += nbytes
+            totals["cache_hits"] += int(cache_hit)
+            totals["observations"] += observations
+        for hook in list(_metrics_hooks):
+            hook(event)
+        return event
+
+    @contextmanager
+    def timer(self, phase, **details):
+        """
+        Context manager recording the time spent in the with-block
+        unless an exception is raised. It yields a dict of keyword arguments
+        for :meth:`record`, which the with-block may update.
+        """
+        start = time.perf_counter()
+        yield details
+        self.record(phase, time.perf_counter() - start, **details)
+
+    def measure_request(self, func, *args, **kwargs):
+        """
+        Call `func`, e.g. :meth:`pandasdmx.Request.get`, and record the
+        "download" and "parse" phases.
+
+        Return: the message returned by `func`
+        """
+        start = time.perf_counter()
+        with capture_transfers() as transfers:
+            msg = func(*args, **kwargs)
+        self._record_request(msg, time.perf_counter() - start, transfers)
+        return msg
+
+    async def measure_request_async(self, func, *args, **kwargs):
+        """
+        Async counterpart of :meth:`measure_request`
+        """
+        start = time.perf_counter()
+        with capture_transfers() as transfers:
+            msg = await func(*args, **kwargs)
+        self._record_request(msg, time.perf_counter() - start, transfers)
+        return msg
+
+    def _record_request(self, msg, seconds, transfers):
+        response = getattr(msg, "response", None)
+        if not transfers and response is not None:
+            # session without record_transfer hook
+            transfers.append(
+                (
+                    response.elapsed.total_seconds(),
+                    len(response.content or b""),
+                    getattr(response, "from_cache", False),
+                )
+            )
+        download = min(sum(t[0] for t in transfers), seconds)
+        self.record(
+            "download",
+            download,
+            nbytes=sum(t[1] for t in transfers),
+            cache_hit=any(t[2] for t in transfers),
+            requests=len(transfers),
+        )
+        observations = sum(len(ds) for ds in getattr(msg, "data", None) or ())
+        self.record("parse", seconds - download, observations=observations)
+
+    def to_dict(self):
+        """
+        Return dict mapping phases to dicts of totals
+        (see :attr:`counters`).
+        """
+        with self._lock:
+            return {phase: totals.copy() for phase, totals in self._phases.items()}
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.to_dict()!r}>"
+
+
+def _unlink(fn):
+    # Path.unlink(missing_ok=True) requires Python 3.8
+    try:
+        fn.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class DiskCache:
+    """
+    Simple persistent key-value store. Each value is stored in a separate file
+    within directory `path`.
+    Values older than `ttl` seconds are considered stale. If the total size
+    of the cached files exceeds `max_size` bytes, the least recently used files are evicted.
+    Subclasses may override :meth:`_dump` and :meth:`_load` to customize serialization.
+    Values which cannot be serialized are not cached.
+
+    Parameters:
+
+        path[str, os.PathLike]: cache directory. It is created if needed.
+        ttl[float]: time to live in seconds. Default is None meaning no expiry.
+        max_size[int]: maximum total size of cache files in bytes.
+            Default is None meaning no limit.
+    """
+
+    suffix = ".pickle"
+
+    def __init__(self, path, ttl=None, max_size=None):
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+
+    def _filename(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.path.joinpath(digest + self.suffix)
+
+    def _dump(self, value, fn):
+        with open(fn, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, fn):
+        with open(fn, "rb") as f:
+            return pickle.load(f)
+
+    @classmethod
+    def from_options(cls, options, ttl=None):
+        """
+        Make a cache from a storage option such as `metadata_cache`.
+        `options` may be a path or a dict with keys
+        "path", "ttl" and "max_size" and any further kwargs of the  constructor.
+        `ttl` is used if `options` does not specify
+        a ttl. Return None if `options` is falsy.
+        """
+        if not options:
+            return None
+        if isinstance(options, (str, os.PathLike)):
+            options = {"path": options}
+        options = dict(options)
+        options.setdefault("ttl", ttl)
+        return cls(**options)
+
+    def __contains__(self, key):
+        fn = self._filename(key)
+        return fn.exists() and not self._expired(fn)
+
+    def _expired(self, fn):
+        return self.ttl is not None and time.time() - fn.stat().st_mtime > self.ttl
+
+    def get(self, key, default=None):
+        """
+        Return cached value for `key` or `default` if `key` is not cached or has expired.
+        """
+        fn = self._filename(key)
+        try:
+            if self._expired(fn):
+                _unlink(fn)
+                return default
+            value = self._load(fn)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return default
+        # record access time for LRU eviction without touching mtime
+        # which determines expiry
+        try:
+            os.utime(fn, (time.time(), fn.stat().st_mtime))
+        except OSError:
+            pass
+        return value
+
+    def mtime(self, key):
+        """
+        Return the time `key` was last set in seconds since the epoch,
+        or None if `key` is not cached.
+        """
+        try:
+            return self._filename(key).stat().st_mtime
+        except OSError:
+            return None
+
+    def set(self, key, value, mtime=None):
+        """
+        Store `value` under `key` and evict old entries if `max_size` is exceeded.
+        `mtime` overrides the modification time of the file, e.g. to record the time
+        a value was requested rather than received.
+        """
+        fn = self._filename(key)
+        tmp = fn.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._dump(value, tmp)
+        except (TypeError, ValueError, pickle.PicklingError):
+            _unlink(tmp)
+            return
+        if mtime is not None:
+            os.utime(tmp, (time.time(), mtime))
+        # atomic so that concurrent processes never read partial files
+        os.replace(tmp, fn)
+        self.evict()
+
+    def __delitem__(self, key):
+        _unlink(self._filename(key))
+
+    def clear(self):
+        for fn in self.path.glob("*" + self.suffix):
+            _unlink(fn)
+
+    def evict(self):
+        """
+        Remove expired files and, if `max_size` is exceeded,
+        the least recently used ones.
+        """
+        files = []
+        for fn in self.path.glob("*" + self.suffix):
+            try:
+                st = fn.stat()
+            except OSError:
+                continue
+            if self.ttl is not None and time.time() - st.st_mtime > self.ttl:
+                _unlink(fn)
+            else:
+                files.append((st.st_atime, st.st_size, fn))
+        if self.max_size is None:
+            return
+        total = sum(f[1] for f in files)
+        for _, size, fn in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_size:
+                break
+            _unlink(fn)
+            total -= size
+
+
+class MetadataCache(DiskCache):
+    """
+    :class:`DiskCache` for SDMX structure messages.
+    Keys are tuples of the form (source_id, resource_type, resource_id, params).
+    """
+
+
+class ResultCache(DiskCache):
+    """
+    :class:`DiskCache` for pandas Series and DataFrames returned by
+    :class:`SDMXData`. They are stored as Arrow IPC or Parquet files
+    and read via memory mapping. Requires pyarrow.
+
+    Parameters:
+
+        format[str]: "arrow" (default) or "parquet"
+        other parameters: see :class:`DiskCache`
+    """
+
+    def __init__(self, path, ttl=None, max_size=None, format="arrow"):
+        if format not in ("arrow", "parquet"):
+            raise ValueError(f"format must be 'arrow' or 'parquet'. {format} given.")
+        # fail early if pyarrow is not installed
+        import pyarrow  # noqa: F401
+
+        self.format = format
+        self.suffix = "." + format
+        super().__init__(path, ttl=ttl, max_size=max_size)
+
+    def _dump(self, value, fn):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Series are stored as single-column tables
+        # tagged in the schema metadata
+        if isinstance(value, pd.Series):
+            if value.name is None:
+                value, tag = value.to_frame(name="value"), {b"intake_sdmx": b"series"}
+            else:
+                value, tag = value.to_frame(), {b"intake_sdmx": b"named"}
+        else:
+            tag = {b"intake_sdmx": b"frame"}
+        try:
+            table = pa.Table.from_pandas(value)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # e.g. objects such as pandasdmx.model.AttributeValue
+            raise ValueError(e) from None
+        table = table.replace_schema_metadata({**table.schema.metadata, **tag})
+        if self.format == "parquet":
+            pq.write_table(table, fn)
+        else:
+            with pa.OSFile(str(fn), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+    def _load(self, fn):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.format == "parquet":
+            table = pq.read_table(fn, memory_map=True)
+        else:
+            table = pa.ipc.open_file(pa.memory_map(str(fn))).read_all()
+        frame = table.to_pandas()
+        tag = table.schema.metadata.get(b"intake_sdmx")
+        if tag == b"series":
+            return frame.iloc[:, 0].rename(None)
+        if tag == b"named":
+            return frame.iloc[:, 0]
+        return frame
+
+
+def entry_size(entry):
+    """
+    Return the approximate size in bytes of a catalog entry
+    including  the allowed values of its parameters.
+    Lists shared by several entries are counted for each of them.
+    """
+    size = sys.getsizeof(entry)
+    for p in getattr(entry, "_user_parameters", ()):
+        allowed = p.allowed or ()
+        size += sys.getsizeof(p) + sys.getsizeof(allowed)
+        size += sum(sys.getsizeof(v) for v in allowed)
+    return size
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with equal keys. While a call for a given key
+    is in flight, other threads calling :meth:`do` with that key wait for it
+    and share its result or exception instead of calling the function again.
+    Results are not kept once the call has returned. This class is thread-safe.
+
+    Parameters:
+
+        copy_result[callable]: if given, each waiting caller gets
+            ``copy_result(result)`` taken before any caller is released
+            so that callers may modify their results. Default: None,
+            meaning that callers share the result.
+
+    Attributes:
+
+        calls[int]: number of calls executed
+        shared[int]: number of calls served by a call in flight
+    """
+
+    def __init__(self, copy_result=None):
+        self._copy_result = copy_result
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call ``func(*args, **kwargs)`` unless a call for `key` is in flight.
+        Calls for `key` made by the thread which runs it are executed
+        rather than waiting for themselves.
+
+        Return: 2-tuple of the result and True if it is shared
+            with the caller which ran the function
+        """
+        me = threading.get_ident()
+        with self._lock:
+            call = self._calls.get(key)
+            reentrant = call is not None and call.thread == me
+            waiting = call is not None and not reentrant
+            if call is None:
+                call = SimpleNamespace(
+                    thread=me,
+                    event=threading.Event(),
+                    result=None,
+                    error=None,
+                    waiters=0,
+                    copies=None,
+                )
+                self._calls[key] = call
+            elif waiting:
+                self.shared += 1
+                call.waiters += 1
+        if reentrant:
+            return func(*args, **kwargs), False
+        if waiting:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            if call.copies is not None:
+                return call.copies.pop(), True
+            return call.result, True
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # no more waiters once the call is removed
+                del self._calls[key]
+                self.calls += 1
+            try:
+                if call.error is None and call.waiters and self._copy_result:
+                    call.copies = [
+                        self._copy_result(call.result) for _ in range(call.waiters)
+                    ]
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                call.event.set()
+        return call.result, False
+
+
+# concurrent identical metadata and data requests
+# made by any catalog or data source share one download.
+# Data are copied as callers may modify them.
+_metadata_flight = SingleFlight()
+_data_flight = SingleFlight(
+    copy_result=lambda result: None if result is None else result.copy()
+)
+
 
 class LazyDict(MutableMapping):
     """
     A dict-like type whose values are computed on first access by calling abcfactory function to be passed to __init__.
+
+    Optionally, the number or total size of computed values is bounded.
+    Least recently used values are then evicted, i.e. reset to None,
+    and recomputed on next access. A value stored under several keys,
+    e.g. a catalog entry under its ID and name, counts once
+    and is evicted under all of them.
+
+    Concurrent accesses to a missing value call the factory only once
+    (see :class:`SingleFlight`).
+
+    Parameters:
+
+        func[callable]: factory called with the key of a missing value
+        max_entries[int]: maximum number of computed values.
+            Default: None (no limit)
+        max_bytes[int]: maximum total size of computed values in bytes
+            as estimated by `sizeof`. Default: None (no limit)
+        sizeof[callable]: estimates the size of a value. Default: :func:`entry_size`
+        on_evict[callable]: called with the list of evicted values
+            after each eviction. Default: None
+        args, kwargs: initial items as for  :class:`dict`
     """
 
-    def __init__(self, func, *args, **kwargs):
+    def __init__(
+        self,
+        func,
+        *args,
+        max_entries=None,
+        max_bytes=None,
+        sizeof=None,
+        on_evict=None,
+        **kwargs,
+    ):
         super().__init__()
         self._dict = dict(*args, **kwargs)
         self._func = func
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or entry_size
+        self._on_evict = on_evict
+        # ids of computed values in LRU order mapped to
+        # the value, its size and the keys it is stored under
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        for key, value in self._dict.items():
+            if value is not None:
+                self._track(key, value)
+        self._evict()
+
+    @property
+    def bounded(self):
+        """True if the number or size of computed values is limited"""
+        return self.max_entries is not None or self.max_bytes is not None
+
+    def stats(self):
+        """
+        Return dict of counters of hits, misses and evictions,
+        accesses which waited for a value being computed by another thread,
+        and the number and estimated  size of computed values.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "shared": self._flight.shared,
+            "entries": len(self._lru),
+            "nbytes": self.nbytes,
+        }
+
+    def _track(self, key, value):
+        # Record computed value as most recently used.
+        # Sizes are estimated only if bounded by bytes.
+        size = None
+        if self.max_bytes is not None and id(value) not in self._lru:
+            size = self._sizeof(value)
+        with self._lock:
+            record = self._lru.pop(id(value), None)
+            if record is None:
+                if size is None:
+                    size = self._sizeof(value) if self.max_bytes is not None else 0
+                record = SimpleNamespace(value=value, size=size, keys=set())
+                self.nbytes += size
+            record.keys.add(key)
+            self._lru[id(value)] = record
+
+    def _untrack(self, key, value):
+        # Record that `value` is no longer stored under `key`
+        with self._lock:
+            record = self._lru.get(id(value))
+            if record is None:
+                return
+            record.keys.discard(key)
+            if not record.keys:
+                del self._lru[id(value)]
+                self.nbytes -= record.size
+
+    def _evict(self):
+        # Reset least recently used values to None
+        # while limits are exceeded. Keep the most recent one.
+        if not self.bounded:
+            return
+        evicted = []
+        with self._lock:
+            while len(self._lru) > 1 and (
+                (self.max_entries is not None and len(self._lru) > self.max_entries)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                _, record = self._lru.popitem(last=False)
+                self.nbytes -= record.size
+                for key in record.keys:
+                    if key in self._dict:
+                        self._dict[key] = None
+                self.evictions += 1
+                evicted.append(record.value)
+        if evicted and self._on_evict is not None:
+            self._on_evict(evicted)
 
     def update(self, *args, **kwargs):
-        return self._dict.update(*args, **kwargs)
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        # MutableMapping.clear would build each value before removing it
+        with self._lock:
+            self._lru.clear()
+            self.nbytes = 0
+        return self._dict.clear()
 
     def __getitem__(self, key):
-        if self._dict[key] is None:
-            self._dict[key] = self._func(key)
-        return self._dict[key]
+        value = self._dict[key]
+        if value is None:
+            value = self._flight.do(key, self._compute, key)[0]
+        else:
+            self.hits += 1
+            if self.bounded:
+                with self._lock:
+                    if id(value) in self._lru:
+                        self._lru.move_to_end(id(value))
+        return value
+
+    def _compute(self, key):
+        # Call the factory unless another thread has stored the value
+        # since it was found missing
+        value = self._dict[key]
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = self._func(key)
+            self[key] = value
+        return value
 
     def __setitem__(self, key, value):
-        return self._dict.__setitem__(key, value)
+        old = self._dict.get(key)
+        self._dict[key] = value
+        if old is not None and old is not value:
+            self._untrack(key, old)
+        if value is not None:
+            self._track(key, value)
+            self._evict()
 
     def __contains__(self, key):
         return self._dict.__contains__(key)
@@ -47,7 +949,9 @@ class LazyDict(MutableMapping):
         return self._dict.__len__()
 
     def __delitem__(self, key):
-        return self._dict.__delitem__(key)
+        value = self._dict.pop(key)
+        if value is not None:
+            self._untrack(key, value)
 
     def __iter__(self):
         return self._dict.__iter__()
@@ -67,114 +971,762 @@ class SDMXSources(Catalog):
     # I thought to set `name`here as well. But it is ignored.
     # so set it as instance attribute below.
 
+    def _make_entries_container(self):
+        return LazyDict(self._make_source_entry)
+
     def _load(self):
         self.name = "SDMX data sources"
         self.description = "SDMX data sources (a.k.a. agencies / data providers)\
         supported by pandaSDMX"
-        # Add  source entries which do not support dataflows
+        # Entries are created on first access. Here, we only
+        # collect source IDs and names.
+        self._source_ids = []
+        self._name2id = {}
         for source_id, source in sdmx.source.sources.items():
             # Take only sources which support dataflow.
             # This excludes json-based sources
             # souch as OECD and ABS as these only allow data queries, not metadata
             if source.supports["dataflow"]:
-                descr = source.name
-                metadata = {"source_id": source_id}
-                e = LocalCatalogEntry(
-                    source_id + "_SDMX_dataflows",
-                    descr,
-                    SDMXDataflows,
-                    direct_access=True,
-                    # set storage_options to {} if not set. This avoids TypeError
-                    # when passing it to sdmx.Request() later
-                    args={"storage_options": self.storage_options or {}},
-                    cache=[],
-                    parameters=[],
-                    metadata=metadata,
-                    catalog_dir="",
-                    getenv=False,
-                    getshell=False,
-                    catalog=self,
-                )
-                self._entries[source_id] = e
+                self._source_ids.append(source_id)
+                self._entries[source_id] = None
                 # add same entry under its name for clarity
-                self._entries[descr] = e
+                self._entries[source.name] = None
+                self._name2id[source.name] = source_id
+        # dataflow catalogs loaded by self.preload()
+        self._dataflows = {}
+        self.errors = {}
 
+    def _make_source_entry(self, key):
+        """
+        Return the catalog entry for the data source whose ID or name is `key`.
+        Called by :class:`LazyDict` on first access.
+        """
+        source_id = self._name2id.get(key, key)
+        descr = sdmx.source.sources[source_id].name
+        e = LocalCatalogEntry(
+            source_id + "_SDMX_dataflows",
+            descr,
+            SDMXDataflows,
+            direct_access=True,
+            # set storage_options to {} if not set. This avoids TypeError
+            # when passing it to sdmx.Request() later
+            args={"storage_options": self.storage_options or {}},
+            cache=[],
+            parameters=[],
+            metadata={"source_id": source_id},
+            catalog_dir="",
+            getenv=False,
+            getshell=False,
+            catalog=self,
+        )
+        # store the entry under the other key as well
+        self._entries[source_id] = e
+        self._entries[descr] = e
+        return e
 
-class SDMXCodeParam(UserParameter):
-    """
-    Helper class to distinguish coded dimensions from other parameters
-    and to perform additional validation. .
-    """
+    @property
+    def source_ids(self):
+        """
+        List of IDs of the data sources in this catalog
+        """
+        return list(self._source_ids)
 
-    def validate(self, value):
-        value = super().validate(value)
-        # additional validations
-        if value != self.default:
-            # replace names by corresponding codes, eg. "US dollar" by "USD"
-            for i in range(len(value)):
-                # Does item have an odd index within self.allowed? Then it is a name.
-                p = self.allowed.index(value[i])
-                if p % 2:
-                    # replace it with its predecessor
-                    value[i] = self.allowed[p - 1]
-            # Check for duplicates
-            if len(value) > len(set(value)):
-                raise ValueError(f"Duplicate codes are not allowed: {value}")
-            # Don't use "*" with regular  codes
-            if len(value) > 1 and "*" in value:
-                raise ValueError(
-                    f"Using '*' alongside regular codes is ambiguous: {value}"
-                )
-        return value
+    def preload(self, source_ids=None, timeout=30.1, max_workers=None):
+        """
+        Load the dataflow catalogs of many data sources concurrently.
+        Failures are isolated: exceptions raised by a source, e.g. due to a timeout,
+        are stored in :attr:`errors` keyed by source ID. Catalogs loaded before
+        are not reloaded.
 
+        Parameters:
 
-class SDMXDataflows(Catalog):
-    """
-    catalog of dataflows for a given SDMX source
-    """
+            source_ids[list]: IDs of data sources to load.
+                Default: None, meaning all sources in this catalog
+            timeout[float]: HTTP timeout  per source in seconds. Default: 30.1
+            max_workers[int]: maximum number of sources to load concurrently.
+                Default: None, meaning all at once.
 
-    version = __version__
-    container = "catalog"
-    partition_access = False
+        Return: dict mapping source IDs to :class:`SDMXDataflows` instances
+        loaded successfully
+        """
+        if source_ids is None:
+            source_ids = self.source_ids
+        pending = [i for i in source_ids if i not in self._dataflows]
+        storage_options = {**(self.storage_options or {}), "timeout": timeout}
 
-    def _make_entries_container(self):
-        return LazyDict(self._make_dataflow_entry)
+        def load(source_id):
+            return SDMXDataflows(
+                metadata={"source_id": source_id},
+                storage_options=storage_options,
+                ttl=self.ttl,
+                getenv=self.getenv,
+                getshell=self.getshell,
+            )
 
-    def _load(self):
-        # read metadata on dataflows
+        if pending:
+            with ThreadPoolExecutor(max_workers=max_workers or len(pending)) as ex:
+                futures = {i: ex.submit(load, i) for i in pending}
+                for source_id, future in futures.items():
+                    try:
+                        self._dataflows[source_id] = future.result()
+                        self.errors.pop(source_id, None)
+                    except Exception as e:
+                        self.errors[source_id] = e
+        return {i: self._dataflows[i] for i in source_ids if i in self._dataflows}
+
+    def search(
+        self,
+        text,
+        operator="|",
+        prefix=True,
+        descriptions=False,
+        limit=None,
+        **preload_kwargs,
+    ):
+        """
+        Search the dataflows of all data sources.
+        Dataflow catalogs are loaded concurrently by :meth:`preload`.
+
+        Parameters:
+
+            text, operator, prefix, descriptions, limit: see
+                :meth:`SDMXDataflows.search`
+            preload_kwargs: passed to :meth:`preload`
+
+        Return: :class:`intake.catalog.Catalog` of matching dataflows
+            keyed by "<source ID>.<dataflow ID>" and  ranked by the number of
+            matching words
+        """
+        if operator not in ["&", "|"]:
+            raise ValueError(f"Operator must be one of '&' or '|'. {operator} given.")
+        catalogs = self.preload(**preload_kwargs)
+        hits = []
+        for source_rank, (source_id, cat) in enumerate(catalogs.items()):
+            scores = cat._index.match(
+                text, operator=operator, prefix=prefix, descriptions=descriptions
+            )
+            hits.extend(
+                (-score, source_rank, cat._index.rank(flow_id), source_id, flow_id)
+                for flow_id, score in scores.items()
+            )
+        hits.sort()
+
+        def make_entry(key):
+            source_id, flow_id = key.split(".", 1)
+            # copy as intake binds entries to the catalog serving them
+            return copy.copy(catalogs[source_id]._entries[flow_id])
+
+        entries = LazyDict(make_entry, {f"{h[3]}.{h[4]}": None for h in hits[:limit]})
+        cat = Catalog.from_dict(
+            entries,
+            name="SDMX_search",
+            description=f"Dataflows matching '{text}'",
+            metadata={"search": {"text": text, "upstream": self.name}},
+            ttl=self.ttl,
+        )
+        cat.cat = self
+        return cat
+
+
+def artefact_key(artefact):
+    """
+    Return (agency, id, version) tuple identifying
+    a maintainable SDMX artefact or a reference to it.
+    """
+    maintainer = getattr(artefact, "maintainer", None)
+    agency = maintainer.id if maintainer is not None else None
+    return agency, artefact.id, getattr(artefact, "version", None)
+
+
+class StructureRegistry:
+    """
+    Registry of SDMX structures (DSDs, codelists and concept schemes)
+    of a given SDMX source. Structures are  keyed by (agency, id, version).
+    Thus, dataflows sharing a structure share a single instance of it.
+    The registry also caches the flattened codes of each codelist
+    as required for :class:`SDMXCodeParam`.
+    """
+
+    # maps kinds of structures to the corresponding attributes of
+    # :class:`pandasdmx.message.StructureMessage`
+    kinds = {
+        "datastructure": "structure",
+        "codelist": "codelist",
+        "conceptscheme": "concept_scheme",
+    }
+
+    def __init__(self):
+        self._structures = {kind: {} for kind in self.kinds}
+        self._codes = {}
+
+    def register(self, msg):
+        """
+        Register all DSDs, codelists and concept schemes  contained in `msg`.
+        Structures already registered are not replaced.
+        """
+        for kind, attr in self.kinds.items():
+            registry = self._structures[kind]
+            for s in getattr(msg, attr, {}).values():
+                if not s.is_external_reference:
+                    registry.setdefault(artefact_key(s), s)
+
+    def get(self, kind, ref):
+        """
+        Return registered structure of type `kind`
+        matching `ref`, or None if it is not registered.
+        """
+        return self._structures[kind].get(artefact_key(ref))
+
+    def __contains__(self, item):
+        kind, ref = item
+        return artefact_key(ref) in self._structures[kind]
+
+    def codelist(self, cl):
+        """
+        Return the registered instance of codelist `cl`.
+        `cl` is registered if it is unknown.
+        """
+        return self._structures["codelist"].setdefault(artefact_key(cl), cl)
+
+    def concept(self, concept):
+        """
+        Return the  concept of the registered  concept scheme
+        equal to that of `concept`.
+        """
+        scheme = getattr(concept, "parent", None)
+        if scheme is None:
+            return concept
+        scheme = self._structures["conceptscheme"].setdefault(
+            artefact_key(scheme), scheme
+        )
+        return scheme.items.get(concept.id, concept)
+
+    def codes(self, cl):
+        """
+        Return list of codes and their names
+        from codelist `cl` followed by :data:`NOT_SPECIFIED`.
+        The list is computed only once per codelist. So it must not be modified.
+        """
+        key = artefact_key(cl)
+        try:
+            return self._codes[key]
+        except KeyError:
+            codes = list(
+                chain(*((c.id, str(c.name)) for c in self.codelist(cl).items.values()))
+            )
+            codes.append(NOT_SPECIFIED)
+            return self._codes.setdefault(key, codes)
+
+    def prune(self, dsd_ids):
+        """
+        Drop the structures not required by the DSDs whose IDs are in `dsd_ids`,
+        e.g. those of the entries kept in memory, and the codes of dropped
+        codelists. Dropped structures are downloaded again when needed.
+        """
+        keep = {kind: set() for kind in self.kinds}
+        for key, dsd in list(self._structures["datastructure"].items()):
+            if dsd.id not in dsd_ids:
+                continue
+            keep["datastructure"].add(key)
+            for dim in dsd.dimensions:
+                lr = getattr(dim, "local_representation", None)
+                if lr is not None and lr.enumerated is not None:
+                    keep["codelist"].add(artefact_key(lr.enumerated))
+                scheme = getattr(dim.concept_identity, "parent", None)
+                if scheme is not None:
+                    keep["conceptscheme"].add(artefact_key(scheme))
+        for kind, registry in self._structures.items():
+            for key in [k for k in list(registry) if k not in keep[kind]]:
+                registry.pop(key, None)
+        for key in [k for k in list(self._codes) if k not in keep["codelist"]]:
+            self._codes.pop(key, None)
+
+    def __len__(self):
+        return sum(len(r) for r in self._structures.values())
+
+
+class SDMXCodeParam(UserParameter):
+    """
+    Helper class to distinguish coded dimensions from other parameters
+    and to perform additional validation. .
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # map codes and their names to codes.
+        # self.allowed contains codes and names in alternating order
+        # followed by NOT_SPECIFIED.
+        allowed = self.allowed or []
+        self._lookup = dict(zip(allowed[::2], allowed[::2]))
+        for code, name in zip(allowed[:-1:2], allowed[1::2]):
+            # codes take precedence over equal names
+            self._lookup.setdefault(name, code)
+        self._lookup[NOT_SPECIFIED] = NOT_SPECIFIED
+
+    def validate(self, value):
+        value = coerce(self.type, value)
+        # additional validations
+        if value != self.default:
+            # replace names by corresponding codes, eg. "US dollar" by "USD"
+            lookup = self._lookup
+            unknown = [v for v in value if v not in lookup]
+            if unknown:
+                raise ValueError(
+                    f"{len(unknown)} item(s) not allowed for {self.name}: {unknown}"
+                )
+            value = [lookup[v] for v in value]
+            # Check for duplicates
+            if len(value) > len(set(value)):
+                raise ValueError(f"Duplicate codes are not allowed: {value}")
+            # Don't use "*" with regular  codes
+            if len(value) > 1 and "*" in value:
+                raise ValueError(
+                    f"Using '*' alongside regular codes is ambiguous: {value}"
+                )
+        return value
+
+
+class SDMXDataflows(Catalog):
+    """
+    catalog of dataflows for a given SDMX source
+    """
+
+    version = __version__
+    container = "catalog"
+    partition_access = False
+
+    def _make_entries_container(self):
+        # optionally bound the memory used by entries
+        plugin_options = split_storage_options(self.storage_options)[0]
+        return LazyDict(
+            self._make_dataflow_entry,
+            max_entries=plugin_options.get("max_entries"),
+            max_bytes=plugin_options.get("max_entries_bytes"),
+            on_evict=self._release_structures,
+        )
+
+    def _release_structures(self, evicted):
+        """
+        Drop structures from the registry which are no longer required by
+        entries kept in memory by this catalog or any other catalog sharing
+        the registry, i.e. search results. Called by :class:`LazyDict` on eviction.
+        """
+        registry = getattr(self, "_registry", None)
+        if registry is None:
+            return
+        with _registry_users_lock:
+            catalogs = list(self._registry_users.values())
+        registry.prune(
+            {
+                entry._metadata.get("structure_id")
+                for cat in catalogs
+                for entry in list(cat._entries._dict.values())
+                if entry is not None
+            }
+        )
+
+    # :class:`pandasdmx.Request`, created on first access
+    _req = None
+
+    @property
+    def req(self):
+        """
+        :class:`pandasdmx.Request` for the SDMX source. Created on first access
+        so that catalogs loaded from a snapshot need not import pandasdmx.
+        """
+        if self._req is None:
+            self._req = make_request(self.metadata["source_id"], self.storage_options)
+        return self._req
+
+    # (catalog searched, dataflow IDs) if made by :meth:`search`
+    _search = None
+
+    def _load(self):
+        if self._search is not None:
+            return self._load_search()
+        start = time.perf_counter()
+        plugin_options = split_storage_options(self.storage_options)[0]
+        snapshot = plugin_options.get("snapshot")
+        if snapshot is not None:
+            snapshot = read_snapshot(snapshot)
+            self.metadata.setdefault("source_id", snapshot["source_id"])
+        if not hasattr(self, "metrics"):
+            self.metrics = Metrics(source_id=self.metadata["source_id"])
+        # read metadata on dataflows
         self.name = self.metadata["source_id"] + "_SDMX_dataflows"
-        # Request dataflows from remote SDMX service
-        self.req = sdmx.Request(self.metadata["source_id"], **self.storage_options)
-        # get full list of dataflows
-        self._flows_msg = self.req.dataflow()
+        # persistent metadata cache, if configured
+        self._metadata_cache = MetadataCache.from_options(
+            plugin_options.get("metadata_cache"), ttl=self.ttl
+        )
+        # registry of DSDs, codelists etc. shared by all entries
+        # and search results
+        self._registry = StructureRegistry()
+        # catalogs sharing the registry keyed by id() as equal catalogs
+        # may have different entries. Search results add themselves.
+        self._registry_users = weakref.WeakValueDictionary({id(self): self})
+        if snapshot is not None:
+            # entries are built from the snapshot without network access.
+            # Others are built as usual.
+            self._flows_msg = None
+            self._snapshot_entries = {
+                record["id"]: record for record in snapshot["entries"]
+            }
+            self._snapshot_codelists = snapshot["codelists"]
+            dataflows = [
+                SimpleNamespace(id=flow_id, name=name, description=descr)
+                for flow_id, name, descr in snapshot["flows"]
+            ]
+        else:
+            self._snapshot_entries = {}
+            # get full list of dataflows from the SDMX service
+            self._flows_msg = self._get_metadata("dataflow")
+            dataflows = list(self._flows_msg.dataflow.values())
         # to mapping from names to IDs for later back-translation
         # We use this catalog to store 2 entries per dataflow: ID and# human-readable name
         self.name2id = {}
-        for dataflow in self._flows_msg.dataflow.values():
+        self.id2name = {}
+        for dataflow in dataflows:
             flow_id, flow_name = dataflow.id, str(dataflow.name)
             # make 2 entries per dataflow using its ID and name
             self._entries[flow_id] = None
             self._entries[flow_name] = None
             self.name2id[flow_name] = flow_id
+            self.id2name[flow_id] = flow_name
+        self._flows = dataflows
+        # inverted index for search
+        self._index = SearchIndex(dataflows)
+        self.metrics.record(
+            "load",
+            time.perf_counter() - start,
+            cache_hit=snapshot is not None,
+            dataflows=len(dataflows),
+        )
+
+    def to_snapshot(self, path=None, flow_ids=None):
+        """
+        Serialise  the list of dataflows and the entries built so far
+        to a compact msgpack snapshot. Pass its path as the
+        `snapshot` storage option, or call :meth:`from_snapshot`,
+        to rebuild the catalog without network access.
+
+        Parameters:
+
+            path[str, Path]: file to write the snapshot to.
+                Default: None, meaning return it as bytes
+            flow_ids[list]: IDs or names of dataflows whose entries are built
+                (if need be) and included  in addition to those built before.
+                Default: None
+
+        Return: bytes if `path` is None
+        """
+        for flow_id in flow_ids or []:
+            self._entries[flow_id]
+        entries = {}
+        for entry in self._entries._dict.values():
+            if entry is not None:
+                entries.setdefault(entry._metadata["dataflow_id"], entry)
+        # Entries share  lists of codes. Store each list only once.
+        codelists = []
+        codelist_index = {}
+        records = []
+        for flow_id, entry in entries.items():
+            params = []
+            defaults = {}
+            for p in entry._user_parameters:
+                if isinstance(p, SDMXCodeParam):
+                    i = codelist_index.setdefault(id(p.allowed), len(codelists))
+                    if i == len(codelists):
+                        codelists.append(p.allowed)
+                    params.append([p.name, p.description, i])
+                else:
+                    defaults[p.name] = p.default
+            records.append(
+                {
+                    "id": flow_id,
+                    "description": entry._description,
+                    "metadata": entry._metadata,
+                    "params": params,
+                    "time_dim": defaults["time_dim"],
+                    "freq_dim": defaults["freq_dim"],
+                }
+            )
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "intake_sdmx": __version__,
+            "source_id": self.metadata["source_id"],
+            "flows": [
+                [flow.id, str(flow.name), str(flow.description or "")]
+                for flow in self._flows
+            ],
+            "codelists": codelists,
+            "entries": records,
+        }
+        data = msgpack.packb(snapshot, use_bin_type=True)
+        if path is None:
+            return data
+        Path(path).write_bytes(data)
+
+    @classmethod
+    def from_snapshot(cls, path, storage_options=None, **kwargs):
+        """
+        Make catalog from  a snapshot written by :meth:`to_snapshot`.
+        Entries contained in the snapshot are built without network access.
+
+        Parameters:
+
+            path[str, Path]: path to the snapshot
+            storage_options[dict]: further storage options
+            kwargs: passed to  :class:`SDMXDataflows`
+        """
+        storage_options = {**(storage_options or {}), "snapshot": str(path)}
+        return cls(storage_options=storage_options, **kwargs)
+
+    def _entry_from_snapshot(self, record):
+        """
+        Make  the catalog entry for a dataflow from its snapshot record.
+        """
+        params = [
+            SDMXCodeParam(
+                name=name,
+                description=descr,
+                type="mlist",
+                allowed=self._snapshot_codelists[i],
+                default=[NOT_SPECIFIED],
+            )
+            for name, descr, i in record["params"]
+        ]
+        metadata = {**self.metadata, **record["metadata"]}
+        return self._make_entry(
+            record["id"],
+            record["description"],
+            metadata,
+            params,
+            record["time_dim"],
+            record["freq_dim"],
+        )
+
+    def _get_metadata(self, resource_type, resource_id=None, **params):
+        """
+        Return  structure message from the metadata cache, if configured,
+        or download it from the SDMX source.
+
+        Parameters:
+
+            resource_type[str]: e.g. "dataflow" or "datastructure"
+            resource_id[str]: ID of the requested artefact. Default: None
+                meaning all artefacts of the given type
+            params: query parameters passed to :meth:`pandasdmx.Request.get`
+
+        Concurrent identical requests share one download.
+        """
+        key = self._metadata_key(resource_type, resource_id, params)
+        # catalogs with different caches or request options must not share
+        cache = self._metadata_cache
+        flight_key = (
+            key,
+            cache and str(cache.path),
+            repr(sorted(split_storage_options(self.storage_options)[1].items())),
+        )
+        with self.metrics.timer("metadata", resource_type=resource_type) as details:
+            msg, shared = _metadata_flight.do(
+                flight_key,
+                self._fetch_metadata,
+                key,
+                resource_type,
+                resource_id,
+                params,
+                details,
+            )
+            if shared:
+                details["shared"] = True
+            return msg
+
+    def _fetch_metadata(self, key, resource_type, resource_id, params, details):
+        """
+        Helper for :meth:`_get_metadata` looking up the metadata cache
+        before downloading the message. `details` are updated
+        for :meth:`Metrics.record`.
+        """
+        cache = self._metadata_cache
+        if cache is not None:
+            msg = cache.get(key)
+            if msg is not None:
+                details["cache_hit"] = True
+                return msg
+        get_kwargs = {"params": params} if params else {}
+        msg = self.metrics.measure_request(
+            getattr(self.req, resource_type), resource_id, **get_kwargs
+        )
+        if cache is not None:
+            # drop the HTTP response which need not be cached
+            # and may not be pickleable
+            msg.response = None
+            cache.set(key, msg)
+        return msg
+
+    def _metadata_key(self, resource_type, resource_id, params):
+        """
+        Return key for the metadata cache
+        """
+        return (
+            self.metadata["source_id"],
+            resource_type,
+            resource_id,
+            tuple(sorted(params.items())),
+        )
+
+    async def _get_metadata_async(
+        self, resource_type, resource_id=None, session=None, **params
+    ):
+        """
+        Async counterpart of :meth:`_get_metadata`
+        """
+        cache = self._metadata_cache
+        key = self._metadata_key(resource_type, resource_id, params)
+        with self.metrics.timer("metadata", resource_type=resource_type) as details:
+            if cache is not None:
+                msg = cache.get(key)
+                if msg is not None:
+                    details["cache_hit"] = True
+                    return msg
+            get_kwargs = {"params": params} if params else {}
+            msg = await self.metrics.measure_request_async(
+                get_async,
+                self.req,
+                resource_type,
+                resource_id,
+                session=session,
+                **get_kwargs,
+            )
+            if cache is not None:
+                msg.response = None
+                cache.set(key, msg)
+            return msg
 
     def _make_dataflow_entry(self, flow_id):
         """
         Factory for dataflow catalog entries. Passed to :class:`LazyDict`
         """
+        with self.metrics.timer("entry", dataflow_id=flow_id):
+            entry = self._build_entry(flow_id)
+        # store the entry under the dataflow's ID and name
+        # so that it is built only once
+        flow_id = entry.name
+        self._entries[flow_id] = entry
+        self._entries[self.id2name[flow_id]] = entry
+        return entry
+
+    def _build_entry(self, flow_id):
+        """
+        Build  the entry for dataflow `flow_id`, which may also be its name,
+        from the snapshot, if any, or from structure messages.
+        """
         # if flow_id is actually its name, get the real id
         if flow_id in self.name2id:
             flow_id = self.name2id[flow_id]
-        # Download metadata on specified dataflow
-        flow_msg = self.req.dataflow(flow_id)
-        flow = flow_msg.dataflow[flow_id]
-        # is the full DSD already in the msg?
-        if flow.structure.is_external_reference:
-            # No. So download it
-            dsd_id = flow.structure.id
-            dsd_msg = self.req.datastructure(dsd_id)
-            dsd = dsd_msg.structure[dsd_id]
+        if flow_id in self._snapshot_entries:
+            return self._entry_from_snapshot(self._snapshot_entries[flow_id])
+        registry = self._registry
+        # Do we already know the DSD from another dataflow?
+        flow_stub = None
+        if self._flows_msg is not None:
+            flow_stub = self._flows_msg.dataflow.get(flow_id)
+        if flow_stub is not None and ("datastructure", flow_stub.structure) in registry:
+            # Yes. So download only the dataflow and constraints referencing it.
+            flow_msg = self._get_metadata("dataflow", flow_id, references="parents")
+            dsd = registry.get("datastructure", flow_stub.structure)
+        else:
+            # Download metadata on specified dataflow including its DSD
+            flow_msg = self._get_metadata("dataflow", flow_id)
+            registry.register(flow_msg)
+            flow = flow_msg.dataflow[flow_id]
+            dsd = registry.get("datastructure", flow.structure)
+            # is the full DSD already in the msg?
+            if dsd is None:
+                # No. So download it
+                dsd_msg = self._get_metadata("datastructure", flow.structure.id)
+                dsd = self._register_dsd(dsd_msg, flow.structure)
+        return self._build_dataflow_entry(flow_id, flow_msg, dsd)
+
+    async def _make_dataflow_entry_async(self, flow_id, session=None):
+        """
+        Async counterpart of :meth:`_make_dataflow_entry`
+        """
+        with self.metrics.timer("entry", dataflow_id=flow_id):
+            return await self._build_entry_async(flow_id, session)
+
+    async def _build_entry_async(self, flow_id, session=None):
+        """
+        Async counterpart of :meth:`_build_entry`
+        """
+        if flow_id in self.name2id:
+            flow_id = self.name2id[flow_id]
+        if flow_id in self._snapshot_entries:
+            return self._entry_from_snapshot(self._snapshot_entries[flow_id])
+        registry = self._registry
+        flow_stub = None
+        if self._flows_msg is not None:
+            flow_stub = self._flows_msg.dataflow.get(flow_id)
+        if flow_stub is not None and ("datastructure", flow_stub.structure) in registry:
+            flow_msg = await self._get_metadata_async(
+                "dataflow", flow_id, session=session, references="parents"
+            )
+            dsd = registry.get("datastructure", flow_stub.structure)
         else:
-            dsd = flow.structure
+            flow_msg = await self._get_metadata_async(
+                "dataflow", flow_id, session=session
+            )
+            registry.register(flow_msg)
+            flow = flow_msg.dataflow[flow_id]
+            dsd = registry.get("datastructure", flow.structure)
+            if dsd is None:
+                dsd_msg = await self._get_metadata_async(
+                    "datastructure", flow.structure.id, session=session
+                )
+                dsd = self._register_dsd(dsd_msg, flow.structure)
+        return self._build_dataflow_entry(flow_id, flow_msg, dsd)
+
+    def _register_dsd(self, dsd_msg, dsd_ref):
+        """
+        Register the structures in `dsd_msg`
+        and return the DSD  referenced by `dsd_ref`.
+        """
+        self._registry.register(dsd_msg)
+        dsd = self._registry.get("datastructure", dsd_ref)
+        if dsd is None:
+            dsd = dsd_msg.structure[dsd_ref.id]
+        return dsd
+
+    async def entry_async(self, flow_id, session=None):
+        """
+        Async counterpart of ``catalog[flow_id]``. Structural metadata
+        is downloaded without blocking the event loop.
+
+        Parameters:
+
+            flow_id[str]: ID or name of a dataflow in this catalog
+            session[aiohttp.ClientSession]: see :func:`get_async`
+
+        Return: :class:`SDMXData` instance
+        """
+        if flow_id not in self._entries:
+            raise KeyError(flow_id)
+        entry = self._entries._dict[flow_id]
+        if entry is None:
+            entry = await self._make_dataflow_entry_async(flow_id, session=session)
+            # store the entry under the dataflow's ID and name
+            flow_id = entry.name
+            self._entries[flow_id] = entry
+            self._entries[self.id2name[flow_id]] = entry
+        return self._get_entry(flow_id)
+
+    def _build_dataflow_entry(self, flow_id, flow_msg, dsd):
+        """
+        Make the catalog entry for dataflow `flow_id` from
+        the dataflow message and the DSD.
+        """
+        registry = self._registry
+        flow = flow_msg.dataflow[flow_id]
         descr = str(flow.name)
         # generate metadata for new catalog entry
         metadata = self.metadata.copy()
@@ -194,20 +1746,19 @@ class SDMXDataflows(Catalog):
             lr = dim.local_representation
             # only dimensions with enumeration, i.e. where values are codes
             if lr.enumerated:
-                ci = dim.concept_identity
+                ci = registry.concept(dim.concept_identity)
+                cl = registry.codelist(lr.enumerated)
                 # Get code ID and  name as its description
                 if constraint and dim.id in constraint:
                     codes_iter = (
-                        c
-                        for c in lr.enumerated.items.values()
-                        if c in constraint[dim.id]
+                        c for c in cl.items.values() if c in constraint[dim.id]
                     )
+                    codes = list(chain(*((c.id, str(c.name)) for c in codes_iter)))
+                    # allow "*" to indicate wild-carded dimension
+                    codes.append(NOT_SPECIFIED)
                 else:
-                    codes_iter = lr.enumerated.items.values()
-                codes = list(chain(*((c.id, str(c.name)) for c in codes_iter)))
-
-                # allow "" to indicate wild-carded dimension
-                codes.append(NOT_SPECIFIED)
+                    # share the list of codes with other entries
+                    codes = registry.codes(cl)
                 p = SDMXCodeParam(
                     name=dim.id,
                     description=str(ci.name),
@@ -229,6 +1780,16 @@ class SDMXDataflows(Catalog):
             freq_dim_id = dim_candidates[0]
         except IndexError:
             freq_dim_id = NOT_SPECIFIED
+        return self._make_entry(
+            flow_id, descr, metadata, params, time_dim_id, freq_dim_id
+        )
+
+    def _make_entry(self, flow_id, descr, metadata, params, time_dim_id, freq_dim_id):
+        """
+        Make the catalog entry for dataflow `flow_id` given its
+        parameters for coded dimensions, and add the other parameters.
+        """
+        params = list(params)
         # params for startPeriod and endPeriod
         year = date.today().year
         params.extend(
@@ -282,6 +1843,63 @@ class SDMXDataflows(Catalog):
                     type="str",
                     default=time_dim_id,
                 ),
+                UserParameter(
+                    name="layout",
+                    description="""'' for the layout given by index_type,
+                    or 'long' for a DataFrame indexed by time with a column
+                    per dimension followed by values and attributes.""",
+                    type="str",
+                    allowed=["", "long"],
+                    default="",
+                ),
+                UserParameter(
+                    name="compact",
+                    description="""If True, return dimension and attribute columns
+                    as categoricals, and values as float32 where lossless.""",
+                    type="bool",
+                    default=False,
+                ),
+                UserParameter(
+                    name="partition_by",
+                    description="""Split requests into partitions along
+                    a coded dimension or along time windows ('time').
+                    Default is '' meaning no partitioning.""",
+                    type="str",
+                    allowed=["", "time", *(p.name for p in params)],
+                    default="",
+                ),
+                UserParameter(
+                    name="partition_size",
+                    description="""Number of codes or years per partition""",
+                    type="int",
+                    min=1,
+                    default=1,
+                ),
+                UserParameter(
+                    name="incremental",
+                    description="""If True, download only observations updated
+                    since the result was cached, and merge them into the cached
+                    result. Requires the result_cache storage option.""",
+                    type="bool",
+                    default=False,
+                ),
+                UserParameter(
+                    name="prune",
+                    description="""If True, download the available series keys
+                    of the dataflow first (cached per dataflow), and skip
+                    partitions and codes for which there are no data.""",
+                    type="bool",
+                    default=False,
+                ),
+                UserParameter(
+                    name="max_workers",
+                    description="""Maximum number of partitions to download
+                    concurrently. Concurrent requests per source are further limited
+                    by intake_sdmx.MAX_CONCURRENT_REQUESTS.""",
+                    type="int",
+                    min=1,
+                    default=1,
+                ),
             ]
         )
         #  jinja2 template for args specification. See intake user guide
@@ -303,43 +1921,539 @@ class SDMXDataflows(Catalog):
         )
 
     @reload_on_change
-    def search(self, text, operator="|"):
+    def search(self, text, operator="|", prefix=True, descriptions=False, limit=None):
         """
-        Make subcatalog of entries whose name contains any word from `text`.
+        Make subcatalog of entries whose ID or name contains any word from `text`.
+        Words are looked up in an  inverted index built on catalog load.
+        Entries are ranked by the number of matching words.
 
         Parameters:
 
             text[str] : space-separated words
             operator[str[: either "&" or "|" meaning AND or OR
+            prefix[bool]: if True (default), words also match
+                longer words starting with them, e.g. "rate" matches "rates"
+            descriptions[bool]: if True, search dataflow descriptions as well.
+                Default: False
+            limit[int]: maximum number of dataflows. Default: None (no limit)
 
         Return: instance of :class:`SDMXDataflows`
         """
         if operator not in ["&", "|"]:
             raise ValueError(f"Operator must be one of '&' or '|'. {operator} given.")
-        func = all if operator == "&" else any
-        words = text.lower().split()
-        cat = SDMXDataflows(
+        flow_ids = self._index.search(
+            text,
+            operator=operator,
+            prefix=prefix,
+            descriptions=descriptions,
+            limit=limit,
+        )
+        cat = self.__class__.__new__(self.__class__)
+        # read by _load instead of loading the dataflows again
+        cat._search = (self, flow_ids)
+        cat.__init__(
             name=self.name + "_search",
             description=self.description,
             ttl=self.ttl,
             getenv=self.getenv,
             getshell=self.getshell,
-            metadata=(self.metadata or {}).copy(),
+            metadata={
+                **(self.metadata or {}),
+                "search": {"text": text, "upstream": self.name},
+            },
             storage_options=self.storage_options,
         )
-        cat.metadata["search"] = {"text": text, "upstream": self.name}
         cat.cat = self
-        cat._entries._dict.clear()
-        keys = [
-            *chain.from_iterable(
-                (self.name2id[k], k)
-                for k in self.name2id
-                if func(word in k.lower() for word in words)
+        return cat
+
+    def _load_search(self):
+        """
+        Load a catalog made by :meth:`search` from the catalog searched:
+        dataflows, search index and entries are limited to the hits,
+        whereas HTTP session, caches, structures and metrics are shared.
+        Entries already built are reused as shallow copies
+        owned by this catalog.
+        """
+        upstream, flow_ids = self._search
+        self.metrics = upstream.metrics
+        self._req = upstream._req
+        self._metadata_cache = upstream._metadata_cache
+        self._registry = upstream._registry
+        self._registry_users = upstream._registry_users
+        with _registry_users_lock:
+            self._registry_users[id(self)] = self
+        self._flows_msg = upstream._flows_msg
+        self._snapshot_entries = upstream._snapshot_entries
+        self._snapshot_codelists = getattr(upstream, "_snapshot_codelists", None)
+        flows = {flow.id: flow for flow in upstream._flows}
+        self._flows = [flows[flow_id] for flow_id in flow_ids]
+        self.id2name = {flow_id: upstream.id2name[flow_id] for flow_id in flow_ids}
+        self.name2id = {name: flow_id for flow_id, name in self.id2name.items()}
+        self._entries.clear()
+        for flow_id, name in self.id2name.items():
+            entry = upstream._entries._dict.get(flow_id)
+            if entry is not None:
+                # as in :meth:`intake.catalog.Catalog.search`
+                entry = copy.copy(entry)
+            self._entries[flow_id] = entry
+            self._entries[name] = entry
+        self._index = SearchIndex(self._flows)
+
+
+class SearchIndex:
+    """
+    Inverted index  mapping lower-case words to  the IDs of
+    dataflows whose ID, name or, optionally, description contain them.
+
+    Parameters:
+
+        dataflows[iterable]: :class:`pandasdmx.model.DataflowDefinition` instances
+    """
+
+    def __init__(self, dataflows):
+        self._postings = {}
+        self._description_postings = {}
+        # rank of each dataflow to break ties in original order
+        self._order = {}
+        for flow in dataflows:
+            self._order[flow.id] = len(self._order)
+            for word in self.tokenize(f"{flow.id} {flow.name}"):
+                self._postings.setdefault(word, set()).add(flow.id)
+            for word in self.tokenize(str(flow.description or "")):
+                self._description_postings.setdefault(word, set()).add(flow.id)
+        # sorted words for prefix lookup
+        self._words = sorted(self._postings)
+        self._description_words = sorted(self._description_postings)
+
+    @staticmethod
+    def tokenize(text, parts=True):
+        """
+        Return set of lower-case words of  `text`. Words joined by underscores
+        are indexed both as a whole and, if `parts` is True, individually.
+        """
+        text = text.lower()
+        words = set(re.findall(r"\w+", text))
+        if parts:
+            words |= set(re.findall(r"[^\W_]+", text))
+        return words
+
+    @staticmethod
+    def _lookup(word, postings, words, prefix):
+        if not prefix:
+            return postings.get(word, set())
+        result = set()
+        for w in words[bisect_left(words, word) :]:
+            if not w.startswith(word):
+                break
+            result |= postings[w]
+        return result
+
+    def lookup(self, word, prefix=True, descriptions=False):
+        """
+        Return set of IDs of dataflows containing  `word`.
+        """
+        result = self._lookup(word, self._postings, self._words, prefix)
+        if descriptions:
+            result = result | self._lookup(
+                word, self._description_postings, self._description_words, prefix
             )
+        return result
+
+    def match(self, text, operator="|", prefix=True, descriptions=False):
+        """
+        Return dict mapping IDs of dataflows matching any ("|") or all ("&") words
+        in `text` to the number of matching words. `text` is split into words
+        as by :meth:`tokenize`. Words joined by underscores are not split
+        as they are indexed as a whole.
+        """
+        words = self.tokenize(text, parts=False)
+        hits = [self.lookup(w, prefix=prefix, descriptions=descriptions) for w in words]
+        if not hits:
+            return {}
+        if operator == "&":
+            matches = set.intersection(*hits)
+        else:
+            matches = set.union(*hits)
+        return {i: sum(i in h for h in hits) for i in matches}
+
+    def rank(self, flow_id):
+        """
+        Return position of dataflow `flow_id` in the indexed catalog
+        """
+        return self._order[flow_id]
+
+    def search(self, text, operator="|", prefix=True, descriptions=False, limit=None):
+        """
+        Return list of IDs of dataflows matching any ("|") or all ("&") words
+        in `text`, ranked by the number of matching words.
+        """
+        score = self.match(
+            text, operator=operator, prefix=prefix, descriptions=descriptions
+        )
+        result = sorted(score, key=lambda i: (-score[i], self._order[i]))
+        return result[:limit]
+
+    def __len__(self):
+        return len(self._order)
+
+
+# asyncio counterparts of the semaphores returned by source_semaphore(),
+# one per event loop and source
+_async_semaphores = weakref.WeakKeyDictionary()
+
+
+def async_source_semaphore(source_id):
+    """
+    Return an :class:`asyncio.Semaphore` limiting concurrent requests to `source_id`
+    within the running event loop. See :data:`MAX_CONCURRENT_REQUESTS`.
+    """
+    semaphores = _async_semaphores.setdefault(asyncio.get_running_loop(), {})
+    try:
+        return semaphores[source_id]
+    except KeyError:
+        limit = MAX_CONCURRENT_REQUESTS.get(source_id, DEFAULT_MAX_CONCURRENT_REQUESTS)
+        return semaphores.setdefault(source_id, asyncio.Semaphore(limit))
+
+
+def _prepare_request(req, kwargs):
+    # Mirror the preparation steps of pandasdmx.Request.get.
+    # kwargs are updated in place, e.g. by the DSD to parse the response.
+    req._handle_get_kwargs(kwargs)
+    return req.session.prepare_request(req._request_from_args(kwargs))
+
+
+def _parse_response(req, content, content_type, kwargs):
+    reader = sdmx.reader.get_reader_for_content_type(content_type)()
+    msg = reader.read_message(BytesIO(content), dsd=kwargs.get("dsd", None))
+    return req.source.finish_message(msg, req, **kwargs)
+
+
+async def get_async(req, resource_type, resource_id=None, session=None, **kwargs):
+    """
+    Async counterpart of :meth:`pandasdmx.Request.get`.
+    The request is prepared and the response parsed by pandasdmx
+    in the default executor, whereas the HTTP request is sent via aiohttp.
+    If aiohttp is not installed, :meth:`pandasdmx.Request.get` is
+    called in the default executor.
+    Note that only HTTP headers and the timeout of `req` are applied to
+    aiohttp requests. Other session options such as proxies or caching are ignored.
+
+    Parameters:
+
+        req[pandasdmx.Request]: request for the SDMX source
+        resource_type, resource_id, kwargs: see :meth:`pandasdmx.Request.get`
+        session[aiohttp.ClientSession]: Default: None, meaning a new session
+            for this request
+
+    Return: :class:`pandasdmx.message.Message`
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        import aiohttp
+    except ImportError:
+        return await loop.run_in_executor(
+            None, partial(req.get, resource_type, resource_id, **kwargs)
+        )
+    kwargs.update(resource_type=resource_type, resource_id=resource_id)
+    # may download a DSD to validate the key
+    prepared = await loop.run_in_executor(None, _prepare_request, req, kwargs)
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession()
+    start = time.perf_counter()
+    try:
+        async with session.get(
+            prepared.url,
+            headers=dict(prepared.headers),
+            timeout=aiohttp.ClientTimeout(total=req.timeout),
+        ) as response:
+            if response.status == 501:
+                raise NotImplementedError(
+                    f"{resource_type!r} endpoint at {prepared.url}"
+                )
+            if response.status >= 400:
+                # raise the same error as pandasdmx
+                error_response = requests.Response()
+                error_response.status_code = response.status
+                error_response.url = prepared.url
+                raise requests.HTTPError(
+                    f"{response.status} {response.reason} for url: {prepared.url}",
+                    response=error_response,
+                )
+            content = await response.read()
+            content_type = response.headers.get("content-type")
+        transfers = _transfers.get()
+        if transfers is not None:
+            transfers.append((time.perf_counter() - start, len(content), False))
+    finally:
+        if own_session:
+            await session.close()
+    return await loop.run_in_executor(
+        None, _parse_response, req, content, content_type, kwargs
+    )
+
+
+async def gather_read(*sources):
+    """
+    Read many :class:`SDMXData` instances concurrently.
+    If aiohttp is installed, HTTP requests share a single session.
+
+    Return: list of pandas Series or DataFrames in the order of `sources`
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        return await asyncio.gather(*(s.read_async() for s in sources))
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(*(s.read_async(session=session) for s in sources))
+
+
+def key_length(key):
+    """
+    Return the length of the string representation of `key`
+    in the URL of a data request.
+    """
+    return sum(len(c) + 1 for codes in key.values() for c in codes)
+
+
+def halve_key(key):
+    """
+    Split `key` in two by halving the longest list of codes.
+    Return None if each dimension has a single code.
+    """
+    dim = max(key, key=lambda d: len("+".join(key[d])), default=None)
+    if dim is None or len(key[dim]) < 2:
+        return None
+    codes = key[dim]
+    middle = len(codes) // 2
+    return {**key, dim: codes[:middle]}, {**key, dim: codes[middle:]}
+
+
+def halve_on_error(error, key, split_once=False):
+    """
+    Return the halves of `key` if the data request for it should be retried
+    with them after failing with  `error`, or None.
+
+    Parameters:
+
+        error[requests.HTTPError]: the error raised by the request
+        key[dict]: the key of the request
+        split_once[bool]: True if `key` results from splitting a request
+            rejected with a status in :data:`SPLIT_ONCE_STATUS_CODES`.
+            It is then not split again for such status.
+    """
+    status = error.response.status_code if error.response is not None else None
+    if status not in SPLIT_STATUS_CODES or (
+        split_once and status in SPLIT_ONCE_STATUS_CODES
+    ):
+        return None
+    return halve_key(key)
+
+
+def split_key(key, max_length):
+    """
+    Split `key` into a list of keys each of which has a string representation
+    no longer than `max_length` characters, if possible. The keys
+    are the cartesian product of chunks of the codes of each dimension.
+    """
+    if key_length(key) <= max_length:
+        return [key]
+    chunks = {dim: [list(codes)] for dim, codes in key.items()}
+
+    def longest(dim):
+        return max(len("+".join(c)) for c in chunks[dim])
+
+    while sum(longest(d) + 1 for d in chunks) > max_length:
+        dim = max(chunks, key=longest)
+        if max(len(c) for c in chunks[dim]) < 2:
+            break
+        chunks[dim] = [
+            half
+            for c in chunks[dim]
+            for half in (c[: (len(c) + 1) // 2], c[(len(c) + 1) // 2 :])
+            if half
         ]
-        cat._entries.clear()
-        cat._entries.update({k: None for k in keys})
-        return cat
+    return [dict(zip(chunks, combination)) for combination in product(*chunks.values())]
+
+
+def downcast(values):
+    """
+    Return  float64 `values` (Series) as float32 if this is lossless.
+    Otherwise, return `values` unchanged.
+    """
+    if values.dtype != "float64":
+        return values
+    values32 = values.astype("float32")
+    if ((values32.astype("float64") == values) | values.isna()).all():
+        return values32
+    return values
+
+
+def compact(obj):
+    """
+    Return a copy of Series or DataFrame `obj` with less memory footprint:
+    float64 values are downcast by :func:`downcast`,
+    and columns of objects, e.g. attribute values,  become categoricals
+    of their string representations.
+    """
+    if isinstance(obj, pd.Series):
+        return downcast(obj)
+    columns = {}
+    for i, (_, column) in enumerate(obj.items()):
+        if pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+            column = column.where(column.isna(), column.astype(str)).astype("category")
+        columns[i] = downcast(column)
+    result = pd.concat(columns, axis=1) if columns else obj.copy()
+    result.columns = obj.columns
+    return result
+
+
+class DictionaryBuilder:
+    """
+    Build a dictionary-encoded  pyarrow array of strings value by value
+    without materializing the plain array first.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self.indices = []
+
+    def append(self, value):
+        if value is None:
+            self.indices.append(None)
+        else:
+            self.indices.append(self._codes.setdefault(value, len(self._codes)))
+
+    def finish(self):
+        import pyarrow as pa
+
+        return pa.DictionaryArray.from_arrays(
+            pa.array(self.indices, type=pa.int32()),
+            pa.array(list(self._codes), type=pa.string()),
+        )
+
+
+def arrow_schema(dimensions, attributes=()):
+    """
+    Return the :class:`pyarrow.Schema` of tables returned by
+    :func:`message_to_arrow`: a dictionary-encoded column per dimension and attribute
+    and a float64 "value" column.
+    """
+    import pyarrow as pa
+
+    dict_type = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            *(pa.field(d, dict_type) for d in dimensions),
+            pa.field("value", pa.float64()),
+            *(pa.field(a, dict_type) for a in attributes),
+        ]
+    )
+
+
+def message_to_arrow(data_msg, attributes=""):
+    """
+    Convert  `data_msg` to a :class:`pyarrow.Table` with a row per observation.
+    See :func:`arrow_schema` for the columns.
+
+    Parameters:
+
+        data_msg[pandasdmx.message.DataMessage]: the data
+        attributes[str]: include attributes at levels observation, series and
+            group ("o", "s" or "g") or dataset ("d"). Default: "", i.e. none
+    """
+    import pyarrow as pa
+
+    dsd = data_msg.dataflow.structure
+    dimensions = [d.id for d in dsd.dimensions]
+    attribute_ids = [a.id for a in dsd.attributes] if attributes else []
+    schema = arrow_schema(dimensions, attribute_ids)
+    builders = {c: DictionaryBuilder() for c in dimensions + attribute_ids}
+    values = []
+    for dataset in data_msg.data:
+        for obs in dataset.obs:
+            key = obs.key.values
+            for d in dimensions:
+                kv = key.get(d)
+                builders[d].append(None if kv is None else str(kv.value))
+            values.append(None if obs.value is None else float(obs.value))
+            if attributes:
+                attrib = {}
+                if "d" in attributes:
+                    attrib.update(dataset.attrib)
+                if set(attributes) & set("osg"):
+                    attrib.update(obs.attrib)
+                for a in attribute_ids:
+                    av = attrib.get(a)
+                    builders[a].append(None if av is None else str(av.value))
+    arrays = {c: b.finish() for c, b in builders.items()}
+    arrays["value"] = pa.array(values, type=pa.float64())
+    return pa.Table.from_arrays([arrays[f.name] for f in schema], schema=schema)
+
+
+def merge_updates(old, new):
+    """
+    Merge  `new` observations into `old` ones.
+    Both are Series or DataFrames as returned by :meth:`SDMXData.read`.
+    Values from `new` take precedence.
+    """
+    if new is None or not len(new):
+        return old
+    return new.combine_first(old)
+
+
+def time_windows(start, end=None, years=1):
+    """
+    Split the time range from `start` to `end`
+    into windows spanning `years` calendar years each.
+    `start` and `end` are SDMX time periods such as "2020", "2020-03"
+    or "2020-Q2". If `end` is None, the  current year is assumed.
+
+    Return: list of params dicts with keys "startPeriod" and "endPeriod"
+    """
+    first = int(start[:4])
+    last = int(end[:4]) if end else date.today().year
+    windows = []
+    for year in range(first, last + 1, years):
+        window = {
+            "startPeriod": start if year == first else str(year),
+            "endPeriod": str(min(year + years - 1, last)),
+        }
+        if year + years > last:
+            if end:
+                window["endPeriod"] = end
+            else:
+                del window["endPeriod"]
+        windows.append(window)
+    return windows
+
+
+def read_long_partition(
+    source_id, dataflow_id, key, params, writer_config, kwargs, meta=None
+):
+    """
+    Task computing a partition of :meth:`SDMXData.to_dask`.
+    Its arguments are picklable so that dask may run it in other processes.
+
+    Parameters:
+
+        source_id[str]: ID of the SDMX source
+        dataflow_id[str]: ID of the dataflow
+        key[dict]: key of the data request
+        params[dict]: params of the data request
+        writer_config[dict]: kwargs for
+            :meth:`pandasdmx.message.DataMessage.to_pandas`
+        kwargs[dict]: kwargs of the :class:`SDMXData` instance
+            incl. `storage_options`
+        meta[pandas.DataFrame]: returned if there are no data. Default: None
+
+    Return: the data in long format as returned by :meth:`SDMXData._to_long`
+    """
+    source = SDMXData(
+        metadata={"source_id": source_id, "dataflow_id": dataflow_id}, **kwargs
+    )
+    source._writer_config = writer_config
+    return source._to_long_partition(source._fetch(key, params), meta)
 
 
 class SDMXData(intake.source.base.DataSource):
@@ -356,15 +2470,32 @@ class SDMXData(intake.source.base.DataSource):
     def __init__(self, metadata=None, **kwargs):
         super(SDMXData, self).__init__(metadata=metadata)
         self.name = self.metadata["dataflow_id"]
-        self.req = sdmx.Request(self.metadata["source_id"], **self.storage_options)
         self.kwargs = kwargs
+        self.metrics = Metrics(
+            source_id=self.metadata["source_id"],
+            dataflow_id=self.metadata["dataflow_id"],
+        )
+        self._result_cache = ResultCache.from_options(
+            split_storage_options(self.storage_options)[0].get("result_cache")
+        )
 
-    def read(self):
+    # :class:`pandasdmx.Request`, created on first access
+    _req = None
+
+    @property
+    def req(self):
+        """
+        :class:`pandasdmx.Request` for the SDMX source. Created on first access.
+        """
+        if self._req is None:
+            self._req = make_request(self.metadata["source_id"], self.storage_options)
+        return self._req
+
+    def _make_query(self):
+        """
+        Return key and params for the data request
+        as specified by the instance's kwargs.
         """
-        Request dataset from SDMX data source
-        via HTTP,
-        and convert it to a pandas Series or DataFrame using pandasdmx. The return typedepends on the kwargs passed on instance creation.
-"""
         # construct key for selection of rows and columns. See pandasdmx docs for details.
         key_ids = (
             p.name for p in self.entry._user_parameters if isinstance(p, SDMXCodeParam)
@@ -375,9 +2506,12 @@ class SDMXData(intake.source.base.DataSource):
         # remove endPeriod if it is prior to startPeriod ()
         if params["endPeriod"] < params["startPeriod"]:
             del params["endPeriod"]
-        # Now request the data via HTTP
-        # TODO: handle   optional Request.get kwargs eg. fromfile, timeout.
-        data_msg = self.req.data(self.metadata["dataflow_id"], key=key, params=params)
+        return key, params
+
+    def _make_writer_config(self):
+        """
+        Return kwargs for :meth:`pandasdmx.message.DataMessage.to_pandas`
+        """
         # get writer config.
         # Capture only non-empty values as these will be filled by the writer
         writer_config = {
@@ -395,9 +2529,694 @@ class SDMXData(intake.source.base.DataSource):
             datetime["freq"] = True if freq_dim == NOT_SPECIFIED else freq_dim
             datetime["dim"] = True if time_dim == NOT_SPECIFIED else time_dim
             writer_config["datetime"] = datetime
+        return writer_config
+
+    def _make_partitions(self, key, params):
+        """
+        Split the query given by `key` and `params` into a list of (key, params) tuples
+        as configured by the `partition_by` and `partition_size` kwargs.
+        """
+        partition_by = self.kwargs.get("partition_by") or ""
+        size = max(int(self.kwargs.get("partition_size") or 1), 1)
+        if not partition_by:
+            return [(key, params)]
+        if partition_by == "time":
+            return [
+                (key, p)
+                for p in time_windows(
+                    params["startPeriod"], params.get("endPeriod"), size
+                )
+            ]
+        # split along a coded dimension
+        if partition_by in key:
+            codes = key[partition_by]
+        else:
+            # dimension is wildcarded. So split  along all allowed codes.
+            param = next(
+                p for p in self.entry._user_parameters if p.name == partition_by
+            )
+            codes = param.allowed[:-1:2]
+        return [
+            ({**key, partition_by: codes[i : i + size]}, params)
+            for i in range(0, len(codes), size)
+        ]
+
+    def _get_schema(self):
+        key, params = self._make_query()
+        self._writer_config = self._make_writer_config()
+        self._partitions = self._make_partitions(key, params)
+        if self.kwargs.get("prune"):
+            self._partitions = self._prune(self._partitions)
+        return intake.source.base.Schema(
+            datashape=None,
+            dtype=None,
+            shape=None,
+            npartitions=len(self._partitions),
+            extra_metadata={},
+        )
+
+    def _series_keys(self):
+        """
+        Return the IDs of the dimensions and a set of tuples of codes,
+        one for each series available in the dataflow.
+        They are cached in memory and, if configured, in the metadata cache
+        for the ttl of the metadata cache or else of the catalog
+        or else :data:`DEFAULT_SERIES_KEYS_TTL`. Thus, series published later
+        are not pruned forever.
+        """
+        cache_key = (self.metadata["source_id"], self.metadata["dataflow_id"])
+        with _series_keys_lock:
+            result, expires = _series_keys.get(cache_key, (None, 0))
+        if result is not None and time.time() < expires:
+            return result
+        ttl = getattr(self.cat, "ttl", None)
+        if ttl is None:
+            ttl = DEFAULT_SERIES_KEYS_TTL
+        cache = MetadataCache.from_options(
+            split_storage_options(self.storage_options)[0].get("metadata_cache"),
+            ttl=ttl,
+        )
+        if cache is not None and cache.ttl is not None:
+            ttl = cache.ttl
+        result = None
+        disk_key = ("serieskeys",) + cache_key
+        if cache is not None:
+            result = cache.get(disk_key)
+        if result is None:
+            with source_semaphore(self.metadata["source_id"]):
+                msg = self.metrics.measure_request(
+                    self.req.data,
+                    self.metadata["dataflow_id"],
+                    params={"detail": "serieskeysonly"},
+                )
+            series = msg.data[0].series if msg.data else {}
+            dims = ()
+            keys = set()
+            for series_key in series:
+                dims = tuple(series_key.values)
+                keys.add(tuple(kv.value for kv in series_key.values.values()))
+            result = dims, frozenset(keys)
+            if cache is not None:
+                cache.set(disk_key, result)
+        with _series_keys_lock:
+            _series_keys[cache_key] = result, time.time() + ttl
+        return result
+
+    def _prune(self, partitions):
+        """
+        Drop those `partitions` for which there are no available series,
+        and restrict the keys of the remaining ones to codes
+        of available series.
+        """
+        dims, series = self._series_keys()
+        pruned = []
+        for key, params in partitions:
+            positions = {dim: dims.index(dim) for dim in key if dim in dims}
+            matches = [
+                s
+                for s in series
+                if all(s[i] in key[dim] for dim, i in positions.items())
+            ]
+            if not matches:
+                continue
+            for dim, i in positions.items():
+                available = {s[i] for s in matches}
+                key = {**key, dim: [c for c in key[dim] if c in available]}
+            pruned.append((key, params))
+        return pruned
+
+    def _cache_key(self, key, params):
+        """
+        Return  key for the result cache identifying the query given by
+        `key` and `params`.
+        """
+        return (
+            self.metadata["source_id"],
+            self.metadata["dataflow_id"],
+            tuple(sorted((dim, tuple(sorted(codes))) for dim, codes in key.items())),
+            tuple(sorted(params.items())),
+            repr(sorted(self._writer_config.items())),
+        )
+
+    def _plan_fetch(self, key, params):
+        """
+        Look up the result cache for the query given by `key` and `params`.
+
+        Return: 3-tuple of the cached result or None, the params
+        for the data request or None if no request is required, and the
+        time of the request
+        """
+        cache = self._result_cache
+        incremental = self.kwargs.get("incremental", False)
+        if cache is None:
+            if incremental:
+                raise ValueError("Incremental mode requires a result cache.")
+            return None, params, None
+        cache_key = self._cache_key(key, params)
+        with self.metrics.timer("cache") as details:
+            result = cache.get(cache_key)
+            details["cache_hit"] = result is not None
+        if result is None:
+            download_params = params
+        elif incremental:
+            # request only observations updated since the last request
+            last_update = datetime.fromtimestamp(cache.mtime(cache_key), timezone.utc)
+            download_params = {
+                **params,
+                "updatedAfter": last_update.isoformat(timespec="seconds"),
+            }
+        else:
+            download_params = None
+        # record request time so that no updates are missed next time
+        return result, download_params, time.time()
+
+    def _finish_fetch(self, key, params, cached, downloaded, requested):
+        """
+        Merge  `downloaded` data into the `cached` result, if any,
+        and update the result cache.
+        """
+        if cached is None:
+            result = downloaded
+        else:
+            result = merge_updates(cached, downloaded)
+        if self._result_cache is not None:
+            self._result_cache.set(
+                self._cache_key(key, params), result, mtime=requested
+            )
+        return result
+
+    def _fetch(self, key, params):
+        """
+        Return data selected by `key` and `params`
+        from the result cache, if configured, or request it via HTTP
+        and convert it to a pandas Series or DataFrame.
+        In incremental mode, only observations updated since
+        the cached result was requested are downloaded and merged into it.
+        Concurrent identical queries, also by other instances, share one fetch.
+        """
+        # sources with different result caches must each update their own.
+        # Those with different request options must not share.
+        cache = self._result_cache
+        flight_key = (
+            self._cache_key(key, params),
+            cache and str(cache.path),
+            repr(sorted(split_storage_options(self.storage_options)[1].items())),
+        )
+        return _data_flight.do(flight_key, self._fetch_once, key, params)[0]
+
+    def _fetch_once(self, key, params):
+        """
+        Helper for :meth:`_fetch`, which makes concurrent identical queries
+        share one call
+        """
+        cached, download_params, requested = self._plan_fetch(key, params)
+        if download_params is None:
+            return cached
+        downloaded = self._download(key, download_params)
+        return self._finish_fetch(key, params, cached, downloaded, requested)
+
+    def _split_key(self, key, params):
+        """
+        Split `key` such that the URLs of the data requests
+        do not exceed the `max_url_length` storage option
+        or :data:`MAX_URL_LENGTH`.
+        """
+        max_url_length = split_storage_options(self.storage_options)[0].get(
+            "max_url_length", MAX_URL_LENGTH
+        )
+        # estimate length of the URL except the key
+        url_length = (
+            len(self.req.source.url)
+            + len(self.metadata["dataflow_id"])
+            + sum(len(k) + len(str(v)) + 2 for k, v in params.items())
+            + 20
+        )
+        return split_key(key, max_url_length - url_length)
+
+    def _download(self, key, params):
+        """
+        Request data selected by `key` and `params` via HTTP
+        and convert it to a pandas Series or DataFrame.
+        Return None if the source responds that there are no data (HTTP 404).
+        Keys too long for a single request are split, and so are
+        requests rejected by the source as too large
+        (see :data:`SPLIT_STATUS_CODES`).
+        """
+        frames = [self._download_split(k, params) for k in self._split_key(key, params)]
+        return self._combine_splits(frames)
+
+    def _download_split(self, key, params, split_once=False):
+        """
+        Download data selected by `key` and `params`.
+        If the request is rejected as too large, halve the key and try again
+        (see :func:`halve_on_error`).
+        """
+        try:
+            return self._download_one(key, params)
+        except requests.HTTPError as e:
+            halves = halve_on_error(e, key, split_once)
+            if halves is None:
+                raise
+            split_once = split_once or e.response.status_code in SPLIT_ONCE_STATUS_CODES
+        frames = [self._download_split(half, params, split_once) for half in halves]
+        return self._combine_splits(frames)
+
+    def _combine_splits(self, frames):
+        """
+        Combine the frames downloaded for the keys returned by
+        :meth:`_split_key` or :func:`halve_key`.
+        Return None if there are no data for any of them.
+        """
+        if all(f is None for f in frames):
+            return None
+        return self._combine(frames, along_time=False)
+
+    def _download_one(self, key, params):
+        """
+        Request data selected by `key` and `params` via HTTP
+        and convert it to a pandas Series or DataFrame.
+        Return None if the source responds that there are no data (HTTP 404).
+        """
+        data_msg = self._download_message(key, params)
+        if data_msg is None:
+            return None
         # generate the Series or dataframe
-        self._dataframe = data_msg.to_pandas(**writer_config)
+        with self.metrics.timer("convert"):
+            return data_msg.to_pandas(**self._writer_config)
+
+    def _download_message(self, key, params):
+        """
+        Request data selected by `key` and `params` via HTTP.
+        Return  the :class:`pandasdmx.message.DataMessage`, or None if the source
+        responds that there are no data (HTTP 404).
+        """
+        # TODO: handle   optional Request.get kwargs eg. fromfile, timeout.
+        with source_semaphore(self.metadata["source_id"]):
+            try:
+                return self.metrics.measure_request(
+                    self.req.data, self.metadata["dataflow_id"], key=key, params=params
+                )
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    return None
+                raise
+
+    def _iter_messages(self, key, params):
+        """
+        Yield  the data messages for `key` and `params` one by one.
+        Keys are split as by :meth:`_download`.
+        """
+        for k in self._split_key(key, params):
+            yield from self._iter_split_messages(k, params)
+
+    def _iter_split_messages(self, key, params, split_once=False):
+        try:
+            data_msg = self._download_message(key, params)
+        except requests.HTTPError as e:
+            halves = halve_on_error(e, key, split_once)
+            if halves is None:
+                raise
+            split_once = split_once or e.response.status_code in SPLIT_ONCE_STATUS_CODES
+            for half in halves:
+                yield from self._iter_split_messages(half, params, split_once)
+            return
+        if data_msg is not None:
+            yield data_msg
+
+    def _iter_chunks(self, data_msg, chunksize):
+        """
+        Convert `data_msg`  to pandas objects of up to `chunksize` series each.
+        Converted series are removed from `data_msg` to free memory.
+        """
+        dsd = data_msg.dataflow.structure
+        for dataset in data_msg.data:
+            if not dataset.series:
+                # observations not grouped by series
+                with self.metrics.timer("convert"):
+                    frame = sdmx.to_pandas(dataset, dsd=dsd, **self._writer_config)
+                yield frame
+                continue
+            # Drop the flat list of observations. The series hold them as well.
+            dataset.obs = []
+            series_keys = list(dataset.series)
+            for i in range(0, len(series_keys), chunksize):
+                chunk = {
+                    k: dataset.series.pop(k) for k in series_keys[i : i + chunksize]
+                }
+                part = dataset.copy(
+                    update={
+                        "series": chunk,
+                        "obs": list(chain.from_iterable(chunk.values())),
+                    }
+                )
+                with self.metrics.timer("convert"):
+                    frame = sdmx.to_pandas(part, dsd=dsd, **self._writer_config)
+                yield frame
+
+    async def _fetch_async(self, key, params, session=None):
+        """
+        Async counterpart of :meth:`_fetch`
+        """
+        cached, download_params, requested = self._plan_fetch(key, params)
+        if download_params is None:
+            return cached
+        downloaded = await self._download_async(key, download_params, session)
+        return self._finish_fetch(key, params, cached, downloaded, requested)
+
+    async def _download_async(self, key, params, session=None):
+        """
+        Async counterpart of :meth:`_download`
+        """
+        frames = await asyncio.gather(
+            *(
+                self._download_split_async(k, params, session)
+                for k in self._split_key(key, params)
+            )
+        )
+        return self._combine_splits(frames)
+
+    async def _download_split_async(self, key, params, session=None, split_once=False):
+        """
+        Async counterpart of :meth:`_download_split`
+        """
+        try:
+            return await self._download_one_async(key, params, session)
+        except requests.HTTPError as e:
+            halves = halve_on_error(e, key, split_once)
+            if halves is None:
+                raise
+            split_once = split_once or e.response.status_code in SPLIT_ONCE_STATUS_CODES
+        frames = await asyncio.gather(
+            *(
+                self._download_split_async(half, params, session, split_once)
+                for half in halves
+            )
+        )
+        return self._combine_splits(frames)
+
+    async def _download_one_async(self, key, params, session=None):
+        """
+        Async counterpart of :meth:`_download_one`
+        """
+        async with async_source_semaphore(self.metadata["source_id"]):
+            try:
+                data_msg = await self.metrics.measure_request_async(
+                    get_async,
+                    self.req,
+                    "data",
+                    self.metadata["dataflow_id"],
+                    session=session,
+                    key=key,
+                    params=params,
+                )
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    return None
+                raise
+        loop = asyncio.get_running_loop()
+        with self.metrics.timer("convert"):
+            return await loop.run_in_executor(
+                None, partial(data_msg.to_pandas, **self._writer_config)
+            )
+
+    async def read_async(self, session=None):
+        """
+        Async counterpart of :meth:`read`. Partitions are requested concurrently
+        subject to the limits in :data:`MAX_CONCURRENT_REQUESTS`.
+
+        Parameters:
+
+            session[aiohttp.ClientSession]: session for HTTP requests.
+                Default: None, meaning a new session per request.
+                Ignored if aiohttp is not installed.
+        """
+        # may request the series keys via HTTP if `prune` is True
+        await asyncio.get_running_loop().run_in_executor(None, self._load_metadata)
+        with self.metrics.timer("read", partitions=self.npartitions):
+            frames = await asyncio.gather(
+                *(
+                    self._fetch_async(key, params, session)
+                    for key, params in self._partitions
+                )
+            )
+            self._dataframe = self._finalize(self._combine(frames))
         return self._dataframe
 
+    def _get_partition(self, i):
+        """
+        Return partition `i` as a pandas object. It is empty
+        if the source responds that there are no data.
+        """
+        key, params = self._partitions[i]
+        frame = self._fetch(key, params)
+        if frame is None:
+            return pd.Series(dtype="float64")
+        return frame
+
+    def _combine(self, frames, along_time=None):
+        """
+        Concatenate  the pandas objects returned for each partition
+        or sub-request. `along_time` indicates whether `frames` have been
+        requested for different periods rather than  different keys.
+        Default: True if partitioned by time.
+        """
+        frames = [f for f in frames if f is not None and len(f)]
+        if not frames:
+            return pd.Series(dtype="float64")
+        if len(frames) == 1:
+            return frames[0]
+        if along_time is None:
+            along_time = self.kwargs.get("partition_by") == "time"
+        # wide DataFrames with datetime or period index
+        # have a column per series. Hence, partitions by dimension
+        # must be joined column-wise.
+        if (
+            isinstance(frames[0], pd.DataFrame)
+            and "datetime" in self._writer_config
+            and not along_time
+        ):
+            return pd.concat(frames, axis=1)
+        return pd.concat(frames)
+
+    def read(self):
+        """
+        Request dataset from SDMX data source
+        via HTTP,
+        and convert it to a pandas Series or DataFrame using pandasdmx. The return typedepends on the kwargs passed on instance creation.
+        If the instance is partitioned, partitions are requested
+        one by one or, if `max_workers` > 1, concurrently. They are concatenated
+        in the order of the partitions.
+        """
+        self._load_metadata()
+        max_workers = min(int(self.kwargs.get("max_workers") or 1), self.npartitions)
+        with self.metrics.timer("read", partitions=self.npartitions):
+            if max_workers > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    frames = list(
+                        executor.map(self._get_partition, range(self.npartitions))
+                    )
+            else:
+                frames = [self._get_partition(i) for i in range(self.npartitions)]
+            self._dataframe = self._finalize(self._combine(frames))
+        return self._dataframe
+
+    def read_partition(self, i):
+        """
+        Return partition `i` in the layout and dtypes  specified
+        by the `layout` and `compact` kwargs.
+        """
+        self._load_metadata()
+        return self._finalize(self._get_partition(i))
+
+    def _finalize(self, frame):
+        """
+        Apply the `layout` and `compact` kwargs to `frame` as returned
+        by :meth:`_get_partition` or :meth:`_combine`.
+        """
+        if self.kwargs.get("layout") == "long" and len(frame):
+            frame = self._to_long(frame)
+        if self.kwargs.get("compact"):
+            frame = compact(frame)
+        return frame
+
+    def read_chunked(self, chunksize=100):
+        """
+        Request dataset from SDMX data source and yield it as pandas Series or DataFrames
+        of up to `chunksize` series each. Index and dtype are the same as for :meth:`read`.
+        Partitions are requested one by one, and each data message is dropped once
+        converted. Thus, peak memory is bounded by the largest data message rather than
+        the whole dataset. The result cache is bypassed.
+
+        Parameters:
+
+            chunksize[int]: maximum number of series per chunk. Default: 100
+        """
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be at least 1. {chunksize} given.")
+        self._load_metadata()
+        for key, params in self._partitions:
+            for data_msg in self._iter_messages(key, params):
+                yield from map(self._finalize, self._iter_chunks(data_msg, chunksize))
+                # free the message before downloading the next one
+                del data_msg
+
+    def read_arrow(self):
+        """
+        Request dataset from SDMX data source and return it as a :class:`pyarrow.Table`
+        with a row per observation,  a dictionary-encoded column per dimension and
+        (if requested by the `attributes` kwarg) per attribute, and a float64
+        "value" column. The table is built directly from the data messages
+        without pandas. Partitions are requested one by one. The result cache,
+        `dtype`, `index_type` and `compact` are ignored. Requires pyarrow.
+        """
+        import pyarrow as pa
+
+        self._load_metadata()
+        attributes = self.kwargs.get("attributes") or ""
+        tables = []
+        for key, params in self._partitions:
+            for data_msg in self._iter_messages(key, params):
+                with self.metrics.timer("convert"):
+                    tables.append(message_to_arrow(data_msg, attributes))
+        if not tables:
+            dimensions = [
+                p.name
+                for p in self.entry._user_parameters
+                if isinstance(p, SDMXCodeParam)
+            ]
+            if self.kwargs["time_dim"] != NOT_SPECIFIED:
+                dimensions.append(self.kwargs["time_dim"])
+            return arrow_schema(dimensions).empty_table()
+        return pa.concat_tables(tables)
+
+    def iter_series(self):
+        """
+        Yield the dataset series by series. See :meth:`read_chunked`.
+        """
+        return self.read_chunked(chunksize=1)
+
+    def _to_long(self, frame):
+        """
+        Convert a  Series or DataFrame  as returned by :meth:`_get_partition`
+        into a DataFrame indexed by time and having a column per dimension
+        and a  "value" column or, if attributes are requested,
+        columns for the values and attributes.
+        """
+        if isinstance(frame, pd.DataFrame) and "datetime" in self._writer_config:
+            # wide DataFrame: one column per series or, if attributes are requested,
+            # per value or attribute and series
+            levels = list(range(frame.columns.nlevels))
+            if self._writer_config.get("attributes"):
+                levels = levels[1:]
+            try:
+                frame = frame.stack(levels, future_stack=True)
+            except TypeError:
+                # pandas < 2.1
+                frame = frame.stack(levels)
+            frame = frame.dropna(how="all")
+            time_level = frame.index.names[0]
+        else:
+            names = frame.index.names
+            time_dim = self.kwargs["time_dim"]
+            time_level = time_dim if time_dim in names else names[-1]
+        if isinstance(frame, pd.Series):
+            frame = frame.rename("value").to_frame()
+        other_levels = [n for n in frame.index.names if n != time_level]
+        frame = frame.reset_index(level=other_levels)
+        # move the value columns behind the dimensions
+        return frame[
+            [*other_levels, *(c for c in frame.columns if c not in other_levels)]
+        ].sort_index(kind="stable")
+
+    def _to_long_partition(self, frame, meta=None):
+        """
+        Convert `frame` as returned by :meth:`_fetch` into a partition
+        for :meth:`to_dask`, i.e. into long format
+        and with the dtypes specified by the `compact` kwarg.
+        Return `meta` if there are no data.
+        """
+        if frame is None or not len(frame):
+            return meta
+        frame = self._to_long(frame)
+        if self.kwargs.get("compact"):
+            # Keep float64 values so that all partitions have the same dtypes.
+            # float32 might be lossy for partitions not yet downloaded.
+            frame = compact(frame)
+            frame = frame.astype(
+                dict.fromkeys(frame.select_dtypes("float32"), "float64")
+            )
+        return frame
+
+    def _divisions(self, index):
+        """
+        Return divisions for a dask DataFrame with partitions by time, or None.
+        `index` is the index of the first partition
+        and determines the  type of the divisions.
+        """
+        if self.kwargs.get("partition_by") != "time":
+            return None
+        years = [int(p["startPeriod"][:4]) for _, p in self._partitions]
+        last = self._partitions[-1][1].get("endPeriod")
+        last = int(last[:4]) if last else date.today().year
+        if isinstance(index, pd.DatetimeIndex):
+            return (
+                *(pd.Timestamp(year=y, month=1, day=1) for y in years),
+                pd.Timestamp(year=last + 1, month=1, day=1) - pd.Timedelta(1),
+            )
+        if isinstance(index, pd.PeriodIndex):
+            freq = index.freq
+            return (
+                *(pd.Period(f"{y}-01-01", freq=freq) for y in years),
+                pd.Period(f"{last}-12-31", freq=freq),
+            )
+        return None
+
+    def to_dask(self):
+        """
+        Return a :class:`dask.dataframe.DataFrame`
+        whose partitions are the partitions of this data source.
+        They are converted to long format, i.e. indexed by time and
+        with a column per dimension. If partitioned by time and `index_type`
+        is "datetime" or "period", the divisions are known.
+        Partitions are downloaded eagerly up to the first one with data,
+        which determines the metadata. Partitions without data are empty.
+        With `compact=True`, dimensions and attributes are categoricals,
+        but values remain float64.
+        Requires dask.
+        """
+        import dask
+        import dask.dataframe as dd
+
+        self._load_metadata()
+        parts = []
+        first = None
+        for key, params in self._partitions:
+            first = self._to_long_partition(self._fetch(key, params))
+            if first is not None:
+                break
+            parts.append(None)
+        if first is None:
+            raise ValueError("There are no data available for this query.")
+        meta = first.iloc[:0]
+        parts = [dask.delayed(meta) for _ in parts]
+        parts.append(dask.delayed(first))
+        # The tasks get plain arguments rather than this instance
+        # as intake pickles data sources without their state.
+        source_id = self.metadata["source_id"]
+        dataflow_id = self.metadata["dataflow_id"]
+        parts.extend(
+            dask.delayed(read_long_partition)(
+                source_id,
+                dataflow_id,
+                key,
+                params,
+                self._writer_config,
+                self.kwargs,
+                meta,
+            )
+            for key, params in self._partitions[len(parts) :]
+        )
+        return dd.from_delayed(parts, meta=meta, divisions=self._divisions(first.index))
+
     def _close(self):
         self._dataframe = None
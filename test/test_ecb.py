@@ -1,8 +1,18 @@
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import intake
 import pandas as pd
 import pytest
+import requests
+from intake.catalog.local import LocalCatalogEntry
 from pandasdmx import Request, read_sdmx
 
 import intake_sdmx
@@ -44,6 +54,22 @@ def test_source(source):
     assert "ECB" in source
 
 
+def test_lazy_import():
+    code = (
+        "import sys, intake_sdmx; "
+        "assert not {'pandas', 'pandasdmx', 'requests'} & set(sys.modules)"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_lazy_sources(source):
+    assert all(e is None for e in source._entries._dict.values())
+    assert "ECB" in source.source_ids
+    entry = source._entries["European Central Bank"]
+    assert source._entries._dict["ECB"] is entry
+    assert entry._metadata["source_id"] == "ECB"
+
+
 def test_ecb(ecb):
     assert isinstance(ecb, intake_sdmx.SDMXDataflows)
     assert "EXR" in ecb
@@ -113,3 +139,812 @@ def test_search(ecb):
     assert l[0] == "EXR"
     assert l[1] == "Exchange Rates"
     assert len(l) == 4
+
+
+def test_metadata_cache(source, tmp_path, mocker):
+    flows_msg = read_sdmx(filepath("ecb_dataflows.xml"))
+    exr_msg = read_sdmx(filepath("exr_flow.xml"))
+    mock = mocker.patch.object(Request, "get", side_effect=[flows_msg, exr_msg])
+    opts = {"metadata_cache": {"path": str(tmp_path), "ttl": 3600}}
+    ecb = intake_sdmx.SDMXDataflows(metadata={"source_id": "ECB"}, storage_options=opts)
+    assert ecb.EXR.name == "EXR"
+    assert mock.call_count == 2
+    # a new catalog is served from disk
+    ecb2 = intake_sdmx.SDMXDataflows(
+        metadata={"source_id": "ECB"}, storage_options=opts
+    )
+    assert ecb2.EXR.name == "EXR"
+    assert mock.call_count == 2
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_disk_cache_eviction(tmp_path):
+    cache = intake_sdmx.DiskCache(tmp_path, max_size=1500)
+    cache.set("a", b"x" * 1000)
+    cache.set("b", b"y" * 1000)
+    assert "a" not in cache
+    assert cache.get("b") == b"y" * 1000
+    expired = intake_sdmx.DiskCache(tmp_path, ttl=-1)
+    assert expired.get("b") is None
+
+
+def test_structure_registry(ecb, mock_exr):
+    ecb.EXR
+    registry = ecb._registry
+    dsd = registry.get("datastructure", ecb._flows_msg.dataflow["EXR"].structure)
+    assert dsd.id == "ECB_EXR1"
+    # codes of unconstrained codelists are computed once
+    cl = dsd.dimensions.get("FREQ").local_representation.enumerated
+    assert registry.codes(cl) is registry.codes(cl)
+    # search results reuse the registry.
+    # So only the dataflow and its parents are requested
+    sub = ecb.search("rates")
+    assert sub._registry is registry
+    # rebuild rather than reuse the entry
+    sub._entries["EXR"] = None
+    sub.EXR
+    assert mock_exr.call_args[1]["params"] == {"references": "parents"}
+
+
+def test_code_param():
+    codes = ["A", "Annual", "M", "Monthly", "*"]
+    p = intake_sdmx.SDMXCodeParam(
+        name="FREQ", type="mlist", allowed=codes, default=["*"]
+    )
+    assert p.validate(["Monthly", "A"]) == ["M", "A"]
+    assert p.validate(["*"]) == ["*"]
+    with pytest.raises(ValueError, match=r"\['X', 'Y'\]"):
+        p.validate(["A", "X", "Y"])
+
+
+def test_time_windows():
+    assert intake_sdmx.time_windows("2019-03", "2021-06") == [
+        {"startPeriod": "2019-03", "endPeriod": "2019"},
+        {"startPeriod": "2020", "endPeriod": "2020"},
+        {"startPeriod": "2021", "endPeriod": "2021-06"},
+    ]
+    assert intake_sdmx.time_windows("2010", "2014", 3) == [
+        {"startPeriod": "2010", "endPeriod": "2012"},
+        {"startPeriod": "2013", "endPeriod": "2014"},
+    ]
+
+
+def test_partitions(exr, mock_get, mocker):
+    exr2 = exr(CURRENCY=["USD", "JPY"], index_type="period", partition_by="CURRENCY")
+    exr2.discover()
+    assert exr2.npartitions == 2
+    part = exr2.read_partition(1)
+    assert mock_get.call_args[1]["key"] == {"CURRENCY": ["JPY"]}
+    df = exr2.read()
+    assert mock_get.call_count == 3
+    assert df.shape == (13, 24)
+    exr3 = exr(startPeriod="2018", endPeriod="2020", partition_by="time")
+    exr3.discover()
+    assert exr3.npartitions == 3
+    exr3.read_partition(2)
+    assert mock_get.call_args[1]["params"] == {
+        "startPeriod": "2020",
+        "endPeriod": "2020",
+    }
+    # empty partitions are empty pandas objects in any layout
+    mock_get.side_effect = requests.HTTPError(response=mocker.Mock(status_code=404))
+    assert isinstance(exr3.read_partition(0), pd.Series)
+    assert exr3(layout="long").read_partition(0).empty
+
+
+def test_concurrent_partitions(exr, mock_get):
+    kwargs = dict(CURRENCY=["USD", "JPY"], index_type="period", partition_by="CURRENCY")
+    serial = exr(**kwargs).read()
+    concurrent = exr(max_workers=2, **kwargs).read()
+    pd.testing.assert_frame_equal(serial, concurrent)
+    assert mock_get.call_count == 4
+
+
+def test_to_dask(exr, mock_get, mocker):
+    exr2 = exr(
+        CURRENCY=["USD", "JPY"],
+        index_type="period",
+        startPeriod="2018",
+        endPeriod="2019",
+        partition_by="time",
+    )
+    ddf = exr2.to_dask()
+    assert ddf.npartitions == 2
+    assert ddf.known_divisions
+    assert list(ddf.columns[-1:]) == ["value"]
+    # only the first partition has been downloaded
+    assert mock_get.call_count == 1
+    df = ddf.compute()
+    assert mock_get.call_count == 2
+    assert isinstance(df.index, pd.PeriodIndex)
+    assert len(df) == exr2.read().count().sum()
+    # tasks survive pickling, e.g. for the processes scheduler
+    cloudpickle = pytest.importorskip("cloudpickle")
+    ddf2 = cloudpickle.loads(cloudpickle.dumps(exr2.to_dask()))
+    pd.testing.assert_frame_equal(ddf2.compute(scheduler="sync"), df)
+    # partitions without data are empty
+    msg = mock_get.return_value
+
+    def get(*args, params, **kwargs):
+        if params["startPeriod"] == empty:
+            raise requests.HTTPError(response=mocker.Mock(status_code=404))
+        return msg
+
+    mock_get.side_effect = get
+    for empty in ["2018", "2019"]:
+        df2 = exr2.to_dask().compute()
+        assert len(df2) == len(df) // 2
+        assert list(df2.columns) == list(df.columns)
+    # compact dimensions and attributes are categoricals
+    mock_get.side_effect = None
+    exr3 = exr(
+        CURRENCY=["USD", "JPY"], partition_by="CURRENCY", compact=True, attributes="os"
+    )
+    df3 = exr3.to_dask().compute()
+    assert isinstance(df3.CURRENCY.dtype, pd.CategoricalDtype)
+    assert df3.value.dtype == "float64"
+
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_result_cache(exr, mock_get, tmp_path, format):
+    pytest.importorskip("pyarrow")
+    opts = {"result_cache": {"path": str(tmp_path), "format": format}}
+    exr2 = exr(CURRENCY=["USD", "JPY"], index_type="period", storage_options=opts)
+    df = exr2.read()
+    assert mock_get.call_count == 1
+    # same query from a new instance is served from the cache
+    df2 = exr(CURRENCY=["JPY", "USD"], index_type="period", storage_options=opts).read()
+    assert mock_get.call_count == 1
+    pd.testing.assert_frame_equal(df, df2)
+    # Series
+    s = exr(CURRENCY=["USD"], storage_options=opts).read()
+    s2 = exr(CURRENCY=["USD"], storage_options=opts).read()
+    assert mock_get.call_count == 2
+    pd.testing.assert_series_equal(s, s2)
+    # different writer config
+    exr(CURRENCY=["USD", "JPY"], storage_options=opts).read()
+    assert mock_get.call_count == 3
+
+
+def test_incremental(exr, mock_get, tmp_path, mocker):
+    pytest.importorskip("pyarrow")
+    opts = {"result_cache": str(tmp_path)}
+    exr2 = exr(
+        CURRENCY=["USD", "JPY"],
+        index_type="period",
+        incremental=True,
+        storage_options=opts,
+    )
+    df = exr2.read()
+    assert "updatedAfter" not in mock_get.call_args[1]["params"]
+    df2 = exr2.read()
+    assert mock_get.call_count == 2
+    assert "updatedAfter" in mock_get.call_args[1]["params"]
+    pd.testing.assert_frame_equal(df, df2)
+    # no updates
+    response = mocker.Mock(status_code=404)
+    mock_get.side_effect = requests.HTTPError(response=response)
+    pd.testing.assert_frame_equal(exr2.read(), df)
+    # incremental mode requires a result cache
+    with pytest.raises(ValueError):
+        exr(incremental=True).read()
+
+
+def test_search_index(ecb):
+    # ranked by number of matching words
+    assert list(ecb.search("interest rates"))[:2] == [
+        "RIR",
+        "Retail Interest Rates",
+    ]
+    assert list(ecb.search("interest rates", operator="&")) == [
+        "RIR",
+        "Retail Interest Rates",
+    ]
+    assert len(ecb.search("rate")) > len(ecb.search("rate", prefix=False))
+    assert len(ecb.search("interest rates", limit=2)) == 4
+    # queries are split into words as names are
+    assert list(ecb.search("short-term", operator="&")) == [
+        "EST",
+        "Euro Short-Term Rate",
+        "STS",
+        "Short-Term Statistics",
+    ]
+
+
+def test_search_no_reload(ecb, mock_exr):
+    # search results are made from the loaded catalog without new requests
+    ecb._entries["EXR"]
+    calls = mock_exr.call_count
+    rates = ecb.search("exchange")
+    assert mock_exr.call_count == calls
+    assert rates._registry is ecb._registry
+    # entries built before are reused as copies owned by the search results
+    entry = rates._entries._dict["EXR"]
+    assert entry is not ecb._entries._dict["EXR"]
+    assert entry._user_parameters is ecb._entries._dict["EXR"]._user_parameters
+    assert entry is rates._entries._dict["Exchange Rates"]
+    rates["EXR"]
+    assert entry._catalog is rates
+    assert ecb._entries._dict["EXR"]._catalog is not rates
+    # nested searches stay inside the search results
+    assert set(rates.search("interest")) <= set(rates)
+    assert not rates.search("interest")._flows
+    assert list(rates.search("rates")) == ["EXR", "Exchange Rates"]
+    assert mock_exr.call_count == calls
+
+
+def test_sources_search(source, mocker):
+    flows_msg = read_sdmx(filepath("ecb_dataflows.xml"))
+    requested = []
+
+    def get(req, *args, **kwargs):
+        """Get the dataflows of any source except BIS"""
+        requested.append(req.source.id)
+        if req.source.id == "BIS":
+            raise requests.ConnectTimeout()
+        return flows_msg
+
+    mocker.patch.object(Request, "get", get)
+    catalogs = source.preload(source_ids=["ECB", "BIS", "ESTAT"])
+    assert list(catalogs) == ["ECB", "ESTAT"]
+    assert isinstance(source.errors["BIS"], requests.ConnectTimeout)
+    assert sorted(requested) == ["BIS", "ECB", "ESTAT"]
+    result = source.search("exchange rates", source_ids=["ECB", "ESTAT"])
+    # no further requests
+    assert len(requested) == 3
+    assert list(result)[:2] == ["ECB.EXR", "ESTAT.EXR"]
+    assert "ECB.RIR" in result
+    # entries are copies so that the preloaded catalogs keep theirs
+    entry = LocalCatalogEntry("EXR", "", "sdmx_data", True)
+    catalogs["ECB"]._entries["EXR"] = entry
+    assert result._entries["ECB.EXR"] is not entry
+    assert result._entries["ECB.EXR"].describe() == entry.describe()
+
+
+def test_shared_session(ecb, exr):
+    # catalog and data source share a pooled session
+    assert exr.req.session is ecb.req.session
+    assert exr(CURRENCY=["USD"]).req.session is ecb.req.session
+    req = intake_sdmx.make_request(
+        "ECB", {"pool_size": 2, "max_retries": 3, "timeout": 5}
+    )
+    assert req.session is not ecb.req.session
+    assert req.timeout == 5
+    adapter = req.session.get_adapter("https://example.org")
+    assert adapter.max_retries.total == 3
+    assert (
+        req.session
+        is intake_sdmx.make_request("ECB", {"pool_size": 2, "max_retries": 3}).session
+    )
+
+
+def test_async_without_aiohttp(ecb, mock_exr, dsd, mocker):
+    # fall back to pandasdmx in the default executor
+    mocker.patch.dict(sys.modules, {"aiohttp": None})
+    exr = asyncio.run(ecb.entry_async("Exchange Rates"))
+    assert isinstance(exr, intake_sdmx.SDMXData)
+    assert exr.name == "EXR"
+    assert "EXR" in ecb._entries._dict
+    mock_get = mocker.patch.object(
+        Request, "get", return_value=read_sdmx(filepath("exr_data.xml"), dsd=dsd)
+    )
+    exr = exr(CURRENCY=["USD", "JPY"], index_type="period")
+    df = asyncio.run(exr.read_async())
+    assert df.shape == (13, 12)
+    dfs = asyncio.run(intake_sdmx.gather_read(exr, exr(CURRENCY=["USD"])))
+    assert len(dfs) == 2
+    assert mock_get.call_count == 3
+    # series keys for pruning are requested outside the event loop
+    intake_sdmx.clear_series_keys()
+    threads = []
+
+    def get(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return mocker.DEFAULT
+
+    mock_get.side_effect = get
+    asyncio.run(exr(CURRENCY=["USD"], prune=True).read_async())
+    assert mock_get.call_args_list[-2][1]["params"] == {"detail": "serieskeysonly"}
+    assert threading.current_thread() not in threads
+    intake_sdmx.clear_series_keys()
+
+
+@pytest.fixture
+def local_source():
+    """An SDMX source served by a local aiohttp server"""
+    aiohttp = pytest.importorskip("aiohttp")
+    from aiohttp import web
+    from pandasdmx.source import add_source, sources
+
+    content_types = {
+        "dataflow": "application/vnd.sdmx.structure+xml;version=2.1",
+        "data": "application/vnd.sdmx.structurespecificdata+xml;version=2.1",
+    }
+    files = {"dataflow": "exr_flow.xml", "data": "exr_data.xml"}
+
+    async def handler(request):
+        resource = request.match_info["resource"]
+        return web.Response(
+            body=filepath(files[resource]).read_bytes(),
+            headers={"content-type": content_types[resource]},
+        )
+
+    app = web.Application()
+    app.router.add_get("/{resource}/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+
+    async def start():
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    loop = asyncio.new_event_loop()
+    port = loop.run_until_complete(start())
+    add_source({"id": "LOCAL", "url": f"http://127.0.0.1:{port}", "name": "local"})
+    yield loop
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+    del sources["LOCAL"]
+
+
+def test_get_async(local_source):
+    req = intake_sdmx.make_request("LOCAL", {})
+    msg = local_source.run_until_complete(
+        intake_sdmx.get_async(req, "data", "EXR", key={"CURRENCY": ["USD", "JPY"]})
+    )
+    assert len(msg.data[0].series) == 12
+
+
+def test_split_key():
+    key = {"CURRENCY": ["USD", "JPY", "GBP", "CHF"], "FREQ": ["M", "D"]}
+    assert intake_sdmx.split_key(key, 100) == [key]
+    keys = intake_sdmx.split_key(key, 12)
+    assert all(intake_sdmx.key_length(k) <= 12 for k in keys)
+    assert len(keys) == 2
+    assert sorted(c for k in keys for c in k["CURRENCY"]) == sorted(key["CURRENCY"])
+    assert len(intake_sdmx.split_key(key, 8)) == 4
+    assert intake_sdmx.halve_key({"FREQ": ["M"]}) is None
+
+
+def test_split_query(exr, mock_get, monkeypatch):
+    kwargs = dict(CURRENCY=["USD", "JPY"], index_type="period")
+    expected = exr(**kwargs).read()
+    assert mock_get.call_count == 1
+    # too long for a single request
+    monkeypatch.setattr(intake_sdmx, "MAX_URL_LENGTH", 100)
+    df = exr(**kwargs).read()
+    assert mock_get.call_count == 3
+    assert mock_get.call_args[1]["key"] == {"CURRENCY": ["JPY"]}
+    # the mock returns the same data for either currency
+    assert df.shape == (expected.shape[0], 2 * expected.shape[1])
+    monkeypatch.undo()
+    # source rejects the request as too large
+    msg = mock_get.return_value
+
+    def get(*args, **kwargs):
+        if sum(map(len, kwargs["key"].values())) > 1:
+            response = requests.Response()
+            response.status_code = 414
+            raise requests.HTTPError(response=response)
+        return msg
+
+    mock_get.side_effect = get
+    df = exr(**kwargs).read()
+    assert mock_get.call_count == 6
+    assert df.shape == (expected.shape[0], 2 * expected.shape[1])
+    # nothing left to split
+    with pytest.raises(requests.HTTPError):
+        exr(CURRENCY=["USD"], FREQ=["M", "D"], index_type="period").read()
+    # 500 may mean a server failure. Split only once.
+    mock_get.reset_mock()
+    response = requests.Response()
+    response.status_code = 500
+    mock_get.side_effect = requests.HTTPError(response=response)
+    currencies = ["USD", "JPY", "GBP", "CHF", "SEK", "NOK", "DKK", "PLN"]
+    with pytest.raises(requests.HTTPError):
+        exr(CURRENCY=currencies, index_type="period").read()
+    assert mock_get.call_count == 2
+
+
+def test_prune(exr, mock_get):
+    intake_sdmx.clear_series_keys()
+    exr2 = exr(
+        CURRENCY=["USD", "CHF", "JPY"], index_type="period", partition_by="CURRENCY"
+    )
+    assert exr2.discover()["npartitions"] == 3
+    assert mock_get.call_count == 0
+    exr2 = exr(
+        CURRENCY=["USD", "CHF", "JPY"],
+        index_type="period",
+        partition_by="CURRENCY",
+        prune=True,
+    )
+    # no series for CHF
+    assert exr2.discover()["npartitions"] == 2
+    assert mock_get.call_args[1]["params"] == {"detail": "serieskeysonly"}
+    assert [key["CURRENCY"] for key, _ in exr2._partitions] == [["USD"], ["JPY"]]
+    exr2.read()
+    assert mock_get.call_count == 3
+    # series keys are cached per dataflow
+    exr3 = exr(CURRENCY=["CHF", "USD"], FREQ=["Q", "M"], prune=True)
+    exr3.discover()
+    assert mock_get.call_count == 3
+    assert exr3._partitions[0][0] == {"CURRENCY": ["USD"], "FREQ": ["Q"]}
+    exr4 = exr(CURRENCY=["CHF"], prune=True)
+    assert exr4.read().empty
+    assert mock_get.call_count == 3
+    intake_sdmx.clear_series_keys()
+
+
+def test_series_keys_expiry(exr, mock_get, dsd, tmp_path, monkeypatch):
+    intake_sdmx.clear_series_keys()
+    # at first, only USD series are available
+    usd_only = read_sdmx(filepath("exr_data.xml"), dsd=dsd)
+    series = usd_only.data[0].series
+    for series_key in list(series):
+        if series_key.values["CURRENCY"].value != "USD":
+            del series[series_key]
+    mock_get.return_value = usd_only
+    opts = {"metadata_cache": {"path": str(tmp_path), "ttl": 60}}
+    kwargs = dict(
+        CURRENCY=["USD", "JPY"],
+        partition_by="CURRENCY",
+        prune=True,
+        storage_options=opts,
+    )
+    assert exr(**kwargs).discover()["npartitions"] == 1
+    # JPY series are published. Cached keys are used until they expire.
+    mock_get.return_value = read_sdmx(filepath("exr_data.xml"), dsd=dsd)
+    assert exr(**kwargs).discover()["npartitions"] == 1
+    assert mock_get.call_count == 1
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert exr(**kwargs).discover()["npartitions"] == 2
+    assert mock_get.call_count == 2
+    intake_sdmx.clear_series_keys()
+
+
+def test_snapshot(ecb, mock_exr, tmp_path, mocker):
+    path = tmp_path / "ecb.msgpack"
+    ecb.to_snapshot(path, flow_ids=["EXR"])
+    exr = ecb._entries["EXR"]
+    rates = list(ecb.search("rates"))
+    mock_get = mocker.patch.object(
+        Request, "get", side_effect=requests.ConnectionError("offline")
+    )
+    cat = intake_sdmx.SDMXDataflows.from_snapshot(path)
+    assert cat.name == "ECB_SDMX_dataflows"
+    assert list(cat) == list(ecb)
+    assert list(cat.search("rates")) == rates
+    entry = cat._entries["Exchange Rates"]
+    assert entry.describe()["user_parameters"] == exr.describe()["user_parameters"]
+    # lists of codes shared by parameters are stored once
+    codelists = {
+        id(p.allowed)
+        for p in exr._user_parameters
+        if isinstance(p, intake_sdmx.SDMXCodeParam)
+    }
+    assert len(intake_sdmx.read_snapshot(path)["codelists"]) == len(codelists)
+    src = cat.EXR(CURRENCY=["USD"], FREQ=["Monthly"])
+    assert src.kwargs["FREQ"] == ["M"]
+    assert mock_get.call_count == 0
+    # other entries are built as usual
+    with pytest.raises(requests.ConnectionError):
+        cat.AME
+    assert ecb.to_snapshot() == path.read_bytes()
+    with pytest.raises(ValueError):
+        intake_sdmx.read_snapshot(filepath("exr_flow.xml"))
+
+
+def test_lazy_dict_lru():
+    calls = []
+
+    def func(key):
+        calls.append(key)
+        return [key] * 100
+
+    d = intake_sdmx.LazyDict(func, dict.fromkeys("abc"), max_entries=2)
+    d["a"], d["b"], d["a"], d["c"]
+    # "b" has been evicted as least recently used
+    assert d._dict["b"] is None
+    assert d._dict["a"] == ["a"] * 100
+    assert d.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+        "shared": 0,
+        "entries": 2,
+        "nbytes": 0,
+    }
+    d["b"]
+    assert calls == ["a", "b", "c", "b"]
+    size = intake_sdmx.entry_size(["a"] * 100)
+    d = intake_sdmx.LazyDict(func, dict.fromkeys("abc"), max_bytes=2 * size)
+    d["a"], d["b"], d["c"]
+    assert d.stats()["nbytes"] == 2 * size
+    assert d.evictions == 1
+    d.clear()
+    assert d.stats()["nbytes"] == 0
+
+
+def test_bounded_entries(source, mocker):
+    mocker.patch.object(
+        Request, "get", return_value=read_sdmx(filepath("ecb_dataflows.xml"))
+    )
+    ecb = intake_sdmx.SDMXDataflows(
+        metadata={"source_id": "ECB"}, storage_options={"max_entries": 1}
+    )
+    assert ecb._entries.max_entries == 1
+    assert not intake_sdmx.split_storage_options(ecb.storage_options)[1]
+    mocker.patch.object(
+        Request, "get", return_value=read_sdmx(filepath("exr_flow.xml"))
+    )
+    exr = ecb.EXR
+    assert isinstance(exr, intake_sdmx.SDMXData)
+    # the entry is stored under its ID and name, but counts once
+    assert ecb._entries["Exchange Rates"] is ecb._entries._dict["EXR"]
+    assert ecb._entries.stats()["entries"] == 1
+    assert ecb._entries.evictions == 0
+    assert len(ecb._registry)
+    # structures still needed by search results sharing the registry are kept
+    rates = ecb.search("exchange")
+    assert rates._registry is ecb._registry
+    ecb._entries["RIR"] = LocalCatalogEntry(
+        "RIR", "", "sdmx_data", True, metadata={"structure_id": "ECB_RIR1"}
+    )
+    assert ecb._entries._dict["EXR"] is None
+    assert ecb._entries._dict["Exchange Rates"] is None
+    assert ecb._entries.evictions == 1
+    dsds = ecb._registry._structures["datastructure"].values()
+    assert [dsd.id for dsd in dsds] == ["ECB_EXR1"]
+    # structures only needed by evicted entries are released
+    del rates
+    gc.collect()
+    ecb._entries["BKN"] = LocalCatalogEntry(
+        "BKN", "", "sdmx_data", True, metadata={"structure_id": "ECB_BKN1"}
+    )
+    assert ecb._entries.evictions == 2
+    assert not len(ecb._registry)
+    assert ecb.EXR.name == "EXR"
+
+
+def test_read_chunked(exr, dsd, mocker):
+    # each request returns a new message as it is consumed by read_chunked
+    mock_get = mocker.patch.object(
+        Request,
+        "get",
+        side_effect=lambda *args, **kwargs: read_sdmx(
+            filepath("exr_data.xml"), dsd=dsd
+        ),
+    )
+    exr2 = exr(CURRENCY=["USD", "JPY"], index_type="period")
+    expected = exr2.read()
+    chunks = list(exr2.read_chunked(chunksize=5))
+    assert [c.shape[1] for c in chunks] == [5, 5, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks, axis=1), expected)
+    series = list(exr2.iter_series())
+    assert len(series) == 12
+    assert all(isinstance(s.index, pd.PeriodIndex) for s in series)
+    # partitions are requested one by one
+    exr3 = exr(CURRENCY=["USD", "JPY"], partition_by="CURRENCY")
+    chunks = exr3.read_chunked(chunksize=100)
+    next(chunks)
+    assert mock_get.call_count == 4
+    assert len(list(chunks)) == 1
+    assert mock_get.call_count == 5
+    pd.testing.assert_series_equal(
+        next(exr3.read_chunked()).sort_index(),
+        exr(CURRENCY=["USD"]).read().sort_index(),
+    )
+    with pytest.raises(ValueError):
+        next(exr2.read_chunked(0))
+
+
+def test_compact(exr, mock_get):
+    values = pd.Series([1.0, 2.5, None])
+    assert intake_sdmx.downcast(values).dtype == "float32"
+    values = pd.Series([1.1, 2.5])
+    assert intake_sdmx.downcast(values).dtype == "float64"
+    kwargs = dict(CURRENCY=["USD", "JPY"], attributes="os")
+    df = exr(**kwargs).read()
+    compact = exr(compact=True, **kwargs).read()
+    assert compact.index.equals(df.index)
+    assert (compact.dtypes[1:] == "category").all()
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 5
+    assert compact.OBS_STATUS.astype(str).equals(df.OBS_STATUS.astype(str))
+    long = exr(
+        layout="long", compact=True, index_type="period", **kwargs
+    ).read_partition(0)
+    assert isinstance(long.index, pd.PeriodIndex)
+    assert list(long.columns[:5]) == [
+        "CURRENCY",
+        "CURRENCY_DENOM",
+        "EXR_TYPE",
+        "EXR_SUFFIX",
+        "value",
+    ]
+    assert len(long) == df.value.count()
+    assert long.CURRENCY.cat.codes.dtype == "int8"
+
+
+def test_read_arrow(exr, mock_get, mocker):
+    pa = pytest.importorskip("pyarrow")
+    exr2 = exr(CURRENCY=["USD", "JPY"])
+    expected = exr2.read()
+    table = exr2.read_arrow()
+    assert table.num_rows == len(expected)
+    assert table.schema.field("CURRENCY").type == pa.dictionary(pa.int32(), pa.string())
+    assert len(table.column("CURRENCY").chunk(0).dictionary) == 6
+    df = table.to_pandas()
+    df = df.astype({c: str for c in expected.index.names}).set_index(
+        expected.index.names
+    )
+    pd.testing.assert_series_equal(
+        df.value.sort_index(), expected.sort_index(), check_names=False
+    )
+    table = exr(CURRENCY=["USD"], attributes="os").read_arrow()
+    assert table.column("OBS_STATUS").null_count == 0
+    assert table.column("OBS_CONF").null_count == table.num_rows
+    # two partitions
+    exr3 = exr(partition_by="time", startPeriod="2018", endPeriod="2019")
+    assert exr3.read_arrow().num_rows == (2 * len(expected))
+    mock_get.side_effect = requests.HTTPError(response=mocker.Mock(status_code=404))
+    table = exr2.read_arrow()
+    assert table.num_rows == 0
+    assert table.column_names[-2:] == ["TIME_PERIOD", "value"]
+
+
+def test_metrics(ecb, mock_exr, dsd, mocker):
+    events = []
+    intake_sdmx.add_metrics_hook(events.append)
+    try:
+        ecb._entries["EXR"]
+        exr = ecb.EXR
+        mocker.patch.object(
+            Request, "get", return_value=read_sdmx(filepath("exr_data.xml"), dsd=dsd)
+        )
+        exr(CURRENCY=["USD", "JPY"]).read()
+    finally:
+        intake_sdmx.remove_metrics_hook(events.append)
+    metrics = ecb.metrics.to_dict()
+    assert metrics["load"]["count"] == 1
+    assert metrics["entry"]["count"] == 1
+    assert metrics["metadata"]["count"] == 2
+    data_metrics = events[-1]
+    assert data_metrics["phase"] == "read"
+    assert data_metrics["dataflow_id"] == "EXR"
+    assert [e["phase"] for e in events[-4:]] == ["download", "parse", "convert", "read"]
+    assert events[-3]["observations"] == 156
+    assert all(e["seconds"] >= 0 for e in events)
+    assert [e["phase"] for e in events if e["source_id"] == "ECB"][:2] == [
+        "download",
+        "parse",
+    ]
+    ecb.metrics.reset()
+    assert not ecb.metrics.to_dict()
+
+
+def test_metrics_bytes(local_source):
+    req = intake_sdmx.make_request("LOCAL", {})
+    metrics = intake_sdmx.Metrics(source_id="LOCAL")
+    local_source.run_until_complete(
+        metrics.measure_request_async(intake_sdmx.get_async, req, "dataflow", "EXR")
+    )
+    totals = metrics.to_dict()
+    assert totals["download"]["bytes"] == filepath("exr_flow.xml").stat().st_size
+    assert totals["parse"]["count"] == 1
+
+
+def test_benchmark_suite(tmp_path):
+    # run the offline benchmarks with tiny sizes against the local server
+    script = Path(__file__).parents[1] / "benchmarks" / "bench_plugin.py"
+    out = tmp_path / "results.json"
+    args = ["--flows", "20", "--codes", "50", "--series", "10", "--obs", "5"]
+    subprocess.run(
+        [sys.executable, str(script), *args, "--repeat", "1", "--json", str(out)],
+        check=True,
+        capture_output=True,
+    )
+    results = json.loads(out.read_text())
+    assert results["dataflows"]["flows"] == 20
+    assert results["validate"]["keys"] == 100
+    assert results["read"]["observations"] == 50
+    assert results["read"]["peak_memory"] > 0
+
+
+def run_concurrently(func, n=8):
+    # call func in n threads at once
+    barrier = threading.Barrier(n)
+
+    def call(_):
+        barrier.wait()
+        return func()
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(call, range(n)))
+
+
+def delayed(path, **kwargs):
+    # side effect for Request.get returning a fresh message after a delay
+    def get(*args, **kw):
+        time.sleep(0.2)
+        return read_sdmx(filepath(path), **kwargs)
+
+    return get
+
+
+def test_single_flight(ecb, dsd, mocker):
+    # the dsd fixture has built the EXR entry. Build it again.
+    ecb._entries.update({"EXR": None, "Exchange Rates": None})
+    misses = ecb._entries.misses
+    mock = mocker.patch.object(Request, "get", side_effect=delayed("exr_flow.xml"))
+    entries = run_concurrently(lambda: ecb._entries["EXR"])
+    assert all(e is entries[0] for e in entries)
+    assert ecb._entries.misses == misses + 1
+    assert ecb._entries.stats()["shared"] == 7
+    assert mock.call_count == 1
+    exr = ecb.EXR
+    mock = mocker.patch.object(
+        Request, "get", side_effect=delayed("exr_data.xml", dsd=dsd)
+    )
+    frames = run_concurrently(lambda: exr(CURRENCY=["USD", "JPY"]).read())
+    assert mock.call_count == 1
+    assert all(f.equals(frames[0]) for f in frames)
+    # callers sharing a result get their own copy
+    assert len({id(f) for f in frames}) == len(frames)
+    # catalogs with other request options make their own requests
+    mocker.patch.object(
+        Request, "get", return_value=read_sdmx(filepath("ecb_dataflows.xml"))
+    )
+    catalogs = [
+        intake_sdmx.SDMXDataflows(
+            metadata={"source_id": "ECB"}, storage_options={"timeout": timeout}
+        )
+        for timeout in [29, 30]
+    ] * 4
+    mock = mocker.patch.object(Request, "get", side_effect=delayed("exr_flow.xml"))
+    run_concurrently(lambda: catalogs.pop()._entries["EXR"])
+    assert mock.call_count == 2
+
+
+def test_single_flight_copies():
+    flight = intake_sdmx.SingleFlight(copy_result=list)
+    result = [0]
+
+    def compute():
+        time.sleep(0.2)
+        return result
+
+    def call():
+        value, shared = flight.do("key", compute)
+        if not shared:
+            value.append(1)
+        return value, shared
+
+    results = run_concurrently(call, n=4)
+    # copies for the waiting callers are taken before any caller may modify them
+    assert sorted(value for value, _ in results) == [[0], [0], [0], [0, 1]]
+    assert sum(value is result for value, _ in results) == 1
+
+
+def test_single_flight_errors():
+    flight = intake_sdmx.SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            return str(e)
+
+    assert run_concurrently(call, n=4) == ["boom"] * 4
+    assert len(calls) == 1
+    assert flight.shared == 3
+    # re-entrant calls by the running thread do not wait for themselves
+    assert flight.do("key", lambda: flight.do("key", lambda: 42)[0]) == (42, False)